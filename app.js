@@ -133,7 +133,7 @@
     if (dischargeData) return dischargeData;
     if (API) {
       try {
-        const res = await fetch(API + "/api/discharge/stations?_=" + Date.now());
+        const res = await fetch(API + "/api/discharge/stations");
         if (res.ok) {
           const geojson = await res.json();
           const stations = [];
@@ -249,7 +249,8 @@
     watershedLayer.clearLayers();
     const cb = get("layer-watershed");
     if (!checked) return;
-    const url = (API || "http://127.0.0.1:8000") + "/api/watershed";
+    // Simplified for zoom 12, the most the layer is fitted to
+    const url = (API || "http://127.0.0.1:8000") + "/api/watershed?zoom=12";
     fetch(url)
       .then((r) => (r.ok ? r.json() : Promise.reject(new Error(r.status + " " + r.statusText))))
       .then((geojson) => {
@@ -279,6 +280,25 @@
     const cb = get("layer-dem");
     if (!checked) return;
     const base = API || "http://127.0.0.1:8000";
+    fetch(base + "/api/dem/tiles.json")
+      .then((r) => (r.ok ? r.json() : Promise.reject(new Error(r.statusText))))
+      .then((info) => {
+        const b = [[info.bounds[1], info.bounds[0]], [info.bounds[3], info.bounds[2]]];
+        demLayer = L.tileLayer(base + "/api/dem/tiles/{z}/{x}/{y}.png?hillshade=true", {
+          bounds: b,
+          minZoom: info.minzoom,
+          maxZoom: info.maxzoom,
+          maxNativeZoom: info.maxzoom,
+          opacity: 0.5,
+          crossOrigin: "anonymous",
+        }).addTo(map);
+        map.fitBounds(b, { maxZoom: 12, padding: [20, 20] });
+      })
+      .catch(() => loadDEMImage(base, cb));
+  }
+
+  // Fallback when the tile pyramid has not been built: one full-extent image overlay
+  function loadDEMImage(base, cb) {
     fetch(base + "/api/dem/bounds")
       .then((r) => (r.ok ? r.json() : Promise.reject(new Error(r.statusText))))
       .then((bounds) => {
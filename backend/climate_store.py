@@ -0,0 +1,342 @@
+"""
+Binary store for the per-grid climate text files (CHIRPS pcp/tmp and SWAT+ .slr).
+
+Each text file is converted once into a packed float32 array (days x columns: value for
+pcp/slr, tmax/tmin for tmp) saved as <store>/<var>/<base>.npy, next to a small
+<base>.json holding the first date's ordinal, the source file's mtime/size and the days
+the file skips (.slr files can have holes). Day i of the array is start + i, so a date
+window is served by offset arithmetic on the memory-mapped array without reading the
+rest of the file. Skipped days are NaN in the array; the records format leaves them out,
+as the text parsers did, while the columnar formats keep the continuous daily axis.
+
+Conversion happens lazily on first access (and again whenever the source file changes),
+or up front for a whole domain with scripts/build_climate_store.py. If the store
+directory is not writable, the parsed arrays are served from memory instead.
+"""
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from discharge_store import encode_columns, values_to_json
+
+STORE_VERSION = 2
+STORE_DIR_NAME = ".climate_store"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# variable -> (subfolder, file extension, columns)
+VARIABLES = {
+    "pcp": ("pcp", ".txt", ("value",)),
+    "tmp": ("tmp", ".txt", ("tmax", "tmin")),
+    "slr": ("slr", ".slr", ("value",)),
+}
+
+
+def _float_or_nan(s: str) -> float:
+    s = s.strip()
+    if not s:
+        return np.nan
+    try:
+        return float(s)
+    except ValueError:
+        return np.nan
+
+
+def _start_ordinal(line: str):
+    """First line of a CHIRPS file (YYYYMMDD) -> ordinal; None if malformed."""
+    s = line.strip()
+    if len(s) != 8:
+        return None
+    try:
+        return date(int(s[:4]), int(s[4:6]), int(s[6:8])).toordinal()
+    except ValueError:
+        return None
+
+
+def parse_pcp(path: Path):
+    """CHIRPS pcp: first line YYYYMMDD, then one value per line. Returns (start_ordinal, float32 n x 1, [])."""
+    with open(path) as f:
+        start = _start_ordinal(f.readline())
+        if start is None:
+            return 0, np.empty((0, 1), dtype=np.float32), []
+        values = [_float_or_nan(line) for line in f]
+    return start, np.array(values, dtype=np.float32).reshape(-1, 1), []
+
+
+def parse_tmp(path: Path):
+    """CHIRTS tmp: first line YYYYMMDD, then 'tmax,tmin' per line. Returns (start_ordinal, float32 n x 2, [])."""
+    with open(path) as f:
+        start = _start_ordinal(f.readline())
+        if start is None:
+            return 0, np.empty((0, 2), dtype=np.float32), []
+        rows = []
+        for line in f:
+            parts = line.strip().split(",")
+            rows.append((
+                _float_or_nan(parts[0]),
+                _float_or_nan(parts[1]) if len(parts) >= 2 else np.nan,
+            ))
+    return start, np.array(rows, dtype=np.float32).reshape(-1, 2), []
+
+
+def parse_slr(path: Path):
+    """
+    SWAT+ .slr: line 4+ are 'year jday value' (-99 = missing). Returns (start_ordinal,
+    float32 n x 1, gaps) on a continuous daily axis; days absent from the file are NaN and
+    listed in gaps as [first, last] array positions.
+    """
+    ordinals, values = [], []
+    with open(path) as f:
+        for _ in range(3):
+            f.readline()
+        for line in f:
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            try:
+                o = date(int(parts[0]), 1, 1).toordinal() + int(parts[1]) - 1
+                v = float(parts[2])
+            except ValueError:
+                continue
+            ordinals.append(o)
+            values.append(np.nan if v == -99 else v)
+    if not ordinals:
+        return 0, np.empty((0, 1), dtype=np.float32), []
+    ordinals = np.array(ordinals, dtype=np.int64)
+    start = int(ordinals.min())
+    out = np.full((int(ordinals.max()) - start + 1, 1), np.nan, dtype=np.float32)
+    out[ordinals - start, 0] = values
+    present = np.zeros(len(out), dtype=bool)
+    present[ordinals - start] = True
+    return start, out, _gap_ranges(present)
+
+
+def _gap_ranges(present) -> list:
+    """Boolean day mask -> [[first, last], ...] runs of False (inclusive positions)."""
+    edges = np.diff(np.concatenate(([1], present.astype(np.int8), [1])))
+    return [[int(a), int(b) - 1] for a, b in zip(np.flatnonzero(edges == -1), np.flatnonzero(edges == 1))]
+
+
+_PARSERS = {"pcp": parse_pcp, "tmp": parse_tmp, "slr": parse_slr}
+
+
+def ordinal_range_iso(first: int, n: int) -> list:
+    """n consecutive days starting at ordinal `first` -> ['YYYY-MM-DD', ...]."""
+    days = np.arange(n, dtype=np.int64) + (first - _EPOCH_ORDINAL)
+    return days.astype("datetime64[D]").astype(str).tolist()
+
+
+class ClimateSeries:
+    """
+    One grid's daily series for one variable: first-day ordinal + float32 days x columns,
+    plus a mask of the days the source file actually has (None = every day).
+    """
+
+    __slots__ = ("variable", "start", "values", "columns", "present")
+
+    def __init__(self, variable: str, start: int, values, gaps=()):
+        self.variable = variable
+        self.start = int(start)
+        self.values = values
+        self.columns = VARIABLES[variable][2]
+        self.present = None
+        if gaps:
+            self.present = np.ones(len(values), dtype=bool)
+            for first, last in gaps:
+                self.present[first:last + 1] = False
+
+    def __len__(self):
+        return len(self.values)
+
+    def index_range(self, start=None, end=None):
+        """Array positions [lo, hi) for inclusive start..end ordinals (None = open-ended)."""
+        n = len(self.values)
+        lo = 0 if start is None else min(max(start - self.start, 0), n)
+        hi = n if end is None else min(max(end - self.start + 1, lo), n)
+        return lo, hi
+
+    def iso_dates(self, lo: int, hi: int) -> list:
+        return ordinal_range_iso(self.start + lo, hi - lo)
+
+    @classmethod
+    def empty(cls, variable: str):
+        return cls(variable, 0, np.empty((0, len(VARIABLES[variable][2])), dtype=np.float32))
+
+    def window(self, start=None, end=None, limit=None):
+        """Positions [lo, hi) for start..end (inclusive ordinals), cut to the last `limit` days."""
+        lo, hi = self.index_range(start, end)
+        if limit and hi - lo > limit:
+            lo = hi - limit
+        return lo, hi
+
+    def encode(self, start=None, end=None, limit=None, fmt="columns") -> dict:
+        """Columnar payload (see encode_columns); single-value series use the column name 'values'."""
+        lo, hi = self.window(start, end, limit)
+        cols = {
+            ("values" if name == "value" else name): self.values[lo:hi, j]
+            for j, name in enumerate(self.columns)
+        }
+        return encode_columns(np.arange(self.start + lo, self.start + hi), cols, fmt)
+
+    def records(self, start=None, end=None, limit=None) -> list:
+        """
+        [{date, <columns>}] for start..end (inclusive ordinals), one per day the source file
+        has (gap days are skipped); `limit` keeps the last N records.
+        """
+        if self.present is None:
+            lo, hi = self.window(start, end, limit)
+            dates, rows = self.iso_dates(lo, hi), self.values[lo:hi]
+        else:
+            lo, hi = self.index_range(start, end)
+            pos = lo + np.flatnonzero(self.present[lo:hi])
+            if limit and len(pos) > limit:
+                pos = pos[-limit:]
+            dates = (pos + (self.start - _EPOCH_ORDINAL)).astype("datetime64[D]").astype(str).tolist()
+            rows = self.values[pos]
+        cols = [values_to_json(rows[:, j]) for j in range(len(self.columns))]
+        return [{"date": d, **dict(zip(self.columns, vals))} for d, *vals in zip(dates, *cols)]
+
+
+def common_window(series_list, start=None, end=None, limit=None):
+    """
+    Shared daily axis (first, last ordinal) spanning all series, clipped to start..end and
+    then to the last `limit` days; None if nothing falls inside.
+    """
+    present = [s for s in series_list if s is not None and len(s)]
+    if not present:
+        return None
+    first = min(s.start for s in present)
+    last = max(s.start + len(s) - 1 for s in present)
+    if start is not None:
+        first = max(first, start)
+    if end is not None:
+        last = min(last, end)
+    if limit and last - first + 1 > limit:
+        first = last - limit + 1
+    return (first, last) if last >= first else None
+
+
+def stack(series_list, variable: str, first: int, last: int):
+    """float32 points x days x columns on the axis first..last; NaN where a series has no data."""
+    out = np.full((len(series_list), last - first + 1, len(VARIABLES[variable][2])), np.nan, dtype=np.float32)
+    for i, s in enumerate(series_list):
+        if s is None:
+            continue
+        lo, hi = s.index_range(first, last)
+        if hi > lo:
+            off = s.start + lo - first
+            out[i, off:off + hi - lo] = s.values[lo:hi]
+    return out
+
+
+def source_path(data_dir: Path, variable: str, base: str) -> Path:
+    sub, ext, _ = VARIABLES[variable]
+    return Path(data_dir) / sub / f"{base}{ext}"
+
+
+def _store_paths(store_dir: Path, variable: str, base: str):
+    d = Path(store_dir) / variable
+    return d / f"{base}.npy", d / f"{base}.json"
+
+
+def _read_meta(path: Path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == STORE_VERSION else None
+
+
+def _atomic_write(path: Path, write):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def convert(variable: str, src: Path, store_dir: Path, st=None):
+    """Parse one text file and write its .npy + .json (meta last). Returns (start, values, gaps)."""
+    st = st or os.stat(src)
+    start, values, gaps = _PARSERS[variable](src)
+    npy_path, meta_path = _store_paths(store_dir, variable, Path(src).stem)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    meta_path.unlink(missing_ok=True)
+    _atomic_write(npy_path, lambda f: np.save(f, values))
+    meta = {"version": STORE_VERSION, "start": start, "gaps": gaps, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    _atomic_write(meta_path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    return start, values, gaps
+
+
+def _is_current(meta, st) -> bool:
+    return meta is not None and meta.get("mtime_ns") == st.st_mtime_ns and meta.get("size") == st.st_size
+
+
+_convert_locks = {}
+_convert_locks_guard = threading.Lock()
+
+
+def _convert_lock(npy_path: Path) -> threading.Lock:
+    """One lock per store file, so concurrent first requests convert it once."""
+    with _convert_locks_guard:
+        return _convert_locks.setdefault(str(npy_path), threading.Lock())
+
+
+@lru_cache(maxsize=256)
+def _open(variable: str, src: str, store_dir: str, mtime_ns: int, size: int) -> ClimateSeries:
+    """Open (converting first if stale) one series; cached per source file version."""
+    st = os.stat(src)
+    npy_path, meta_path = _store_paths(Path(store_dir), variable, Path(src).stem)
+    with _convert_lock(npy_path):
+        meta = _read_meta(meta_path)
+        if _is_current(meta, st):
+            try:
+                return ClimateSeries(variable, meta["start"], np.load(npy_path, mmap_mode="r"), meta.get("gaps"))
+            except (OSError, ValueError):
+                pass
+        try:
+            start, _, gaps = convert(variable, Path(src), Path(store_dir), st)
+            return ClimateSeries(variable, start, np.load(npy_path, mmap_mode="r"), gaps)
+        except OSError:
+            # read-only data folder: serve the parsed arrays from memory
+            return ClimateSeries(variable, *_PARSERS[variable](Path(src)))
+
+
+def open_series(data_dir: Path, variable: str, base: str, store_dir=None):
+    """ClimateSeries for grid `base` (e.g. 'NA_425405') or None if its text file is missing."""
+    src = source_path(data_dir, variable, base)
+    try:
+        st = os.stat(src)
+    except OSError:
+        return None
+    store_dir = Path(store_dir) if store_dir else Path(data_dir) / STORE_DIR_NAME
+    return _open(variable, str(src), str(store_dir), st.st_mtime_ns, st.st_size)
+
+
+def build_store(data_dir: Path, store_dir=None, variables=None, force: bool = False, log=print) -> dict:
+    """Convert every pcp/tmp/slr file under data_dir; returns {variable: (converted, up_to_date)}."""
+    data_dir = Path(data_dir)
+    store_dir = Path(store_dir) if store_dir else data_dir / STORE_DIR_NAME
+    summary = {}
+    for variable in variables or VARIABLES:
+        sub, ext, _ = VARIABLES[variable]
+        converted = current = 0
+        for src in sorted((data_dir / sub).glob(f"*{ext}")):
+            st = os.stat(src)
+            if not force and _is_current(_read_meta(_store_paths(store_dir, variable, src.stem)[1]), st):
+                current += 1
+                continue
+            convert(variable, src, store_dir, st)
+            converted += 1
+        summary[variable] = (converted, current)
+        log(f"{variable}: converted {converted}, up to date {current}")
+    return summary
@@ -0,0 +1,287 @@
+"""
+Precomputed XYZ tile pyramid for the DEM in maps/dem.
+
+build_pyramid() (run once via scripts/build_dem_tiles.py; needs rasterio) reprojects the
+DEM to Web Mercator at max_zoom, aligned to the 256 px XYZ tile grid, and derives each
+lower zoom by 2x2 averaging. Every level is stored as a float32 elevation .npy (NaN =
+no data) in the pyramid folder, with meta.json holding the zoom range, tile extent of
+each level, elevation range and WGS84 bounds.
+
+DemPyramid serves tiles from the memory-mapped levels (numpy + Pillow only): a tile is a
+256x256 slice, colored with a fixed elevation range so tiles match at their seams, and
+optionally hillshaded. Zooms above max_zoom are upsampled from the max level. Rendered
+PNGs are kept in an LRU cache on the DemPyramid (SWAT_DEM_TILE_CACHE tiles, default 512),
+so a rebuilt pyramid drops the old one's tiles and memory-mapped levels together.
+"""
+import io
+import json
+import math
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+PYRAMID_VERSION = 1
+TILE_SIZE = 256
+MAX_OVERZOOM = 6
+WEB_MERCATOR_HALF = 20037508.342789244
+TILE_CACHE_SIZE = int(os.environ.get("SWAT_DEM_TILE_CACHE", "512"))
+
+# colormap -> control points (position 0..1, (r, g, b))
+COLORMAPS = {
+    "gray": [(0.0, (0, 0, 0)), (1.0, (255, 255, 255))],
+    "terrain": [
+        (0.0, (51, 102, 153)),
+        (0.15, (0, 153, 102)),
+        (0.35, (153, 204, 102)),
+        (0.6, (204, 179, 115)),
+        (0.8, (153, 115, 77)),
+        (1.0, (255, 255, 255)),
+    ],
+}
+
+
+def _lut(name: str):
+    """256 x 3 uint8 color table for a colormap."""
+    pos = [p for p, _ in COLORMAPS[name]]
+    x = np.linspace(0.0, 1.0, 256)
+    return np.stack(
+        [np.interp(x, pos, [c[i] for _, c in COLORMAPS[name]]) for i in range(3)], axis=1
+    ).round().astype(np.uint8)
+
+
+_LUTS = {name: _lut(name) for name in COLORMAPS}
+
+
+def resolution(z: int) -> float:
+    """Web Mercator meters per pixel at zoom z."""
+    return 2 * WEB_MERCATOR_HALF / (TILE_SIZE * 2 ** z)
+
+
+def _block_mean(a):
+    """2x2 NaN-aware mean of an array with even height and width."""
+    h, w = a.shape
+    blocks = a.reshape(h // 2, 2, w // 2, 2)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(blocks, axis=(1, 3)).astype(np.float32)
+
+
+def _save_level(out_dir: Path, z: int, arr):
+    tmp = out_dir / f"z{z}.npy.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, out_dir / f"z{z}.npy")
+
+
+def default_max_zoom(dem_path: Path) -> int:
+    """Zoom whose pixel size is closest to the DEM's native resolution (needs rasterio)."""
+    import rasterio
+
+    with rasterio.open(str(dem_path)) as src:
+        res = abs(src.res[0])
+        if src.crs is not None and src.crs.is_geographic:
+            lat = (src.bounds.top + src.bounds.bottom) / 2
+            res *= 111320.0 * math.cos(math.radians(lat))
+    return max(0, round(math.log2(2 * WEB_MERCATOR_HALF / (TILE_SIZE * res))))
+
+
+def build_pyramid(dem_path: Path, out_dir: Path, min_zoom: int, max_zoom: int, log=print) -> dict:
+    """Reproject the DEM at max_zoom, average down to min_zoom, write z*.npy + meta.json."""
+    import rasterio
+    from rasterio.warp import Resampling, reproject, transform_bounds
+    from rasterio.transform import Affine
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "meta.json").unlink(missing_ok=True)
+
+    with rasterio.open(str(dem_path)) as src:
+        west, south, east, north = transform_bounds(src.crs, "EPSG:4326", *src.bounds)
+        left, bottom, right, top = transform_bounds(src.crs, "EPSG:3857", *src.bounds)
+        res = resolution(max_zoom)
+        tile_m = res * TILE_SIZE
+        tx0 = int(math.floor((left + WEB_MERCATOR_HALF) / tile_m))
+        tx1 = int(math.floor((right + WEB_MERCATOR_HALF) / tile_m))
+        ty0 = int(math.floor((WEB_MERCATOR_HALF - top) / tile_m))
+        ty1 = int(math.floor((WEB_MERCATOR_HALF - bottom) / tile_m))
+        ntx, nty = tx1 - tx0 + 1, ty1 - ty0 + 1
+        log(f"z{max_zoom}: reprojecting to {ntx} x {nty} tiles ({ntx * TILE_SIZE} x {nty * TILE_SIZE} px)")
+        tmp = out_dir / f"z{max_zoom}.npy.tmp"
+        level = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(nty * TILE_SIZE, ntx * TILE_SIZE))
+        level[:] = np.nan
+        reproject(
+            source=rasterio.band(src, 1),
+            destination=level,
+            src_nodata=src.nodata,
+            dst_transform=Affine(res, 0, -WEB_MERCATOR_HALF + tx0 * tile_m, 0, -res, WEB_MERCATOR_HALF - ty0 * tile_m),
+            dst_crs="EPSG:3857",
+            dst_nodata=np.nan,
+            resampling=Resampling.bilinear,
+        )
+        level.flush()
+        del level
+        os.replace(tmp, out_dir / f"z{max_zoom}.npy")
+
+    level = np.load(out_dir / f"z{max_zoom}.npy", mmap_mode="r")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        vmin, vmax = float(np.nanmin(level)), float(np.nanmax(level))
+    levels = {str(max_zoom): [tx0, ty0, ntx, nty]}
+    for z in range(max_zoom - 1, min_zoom - 1, -1):
+        # pad the finer level to whole parent tiles, then average 2x2 pixels
+        ptx0, pty0 = tx0 // 2, ty0 // 2
+        pntx, pnty = (tx0 + ntx - 1) // 2 - ptx0 + 1, (ty0 + nty - 1) // 2 - pty0 + 1
+        padded = np.full((pnty * 2 * TILE_SIZE, pntx * 2 * TILE_SIZE), np.nan, dtype=np.float32)
+        ox, oy = (tx0 - 2 * ptx0) * TILE_SIZE, (ty0 - 2 * pty0) * TILE_SIZE
+        padded[oy:oy + level.shape[0], ox:ox + level.shape[1]] = level
+        level = _block_mean(padded)
+        _save_level(out_dir, z, level)
+        tx0, ty0, ntx, nty = ptx0, pty0, pntx, pnty
+        levels[str(z)] = [tx0, ty0, ntx, nty]
+        log(f"z{z}: {ntx} x {nty} tiles")
+
+    meta = {
+        "version": PYRAMID_VERSION,
+        "tile_size": TILE_SIZE,
+        "min_zoom": min_zoom,
+        "max_zoom": max_zoom,
+        "vmin": vmin,
+        "vmax": vmax,
+        "bounds": {"south": south, "north": north, "west": west, "east": east},
+        "levels": levels,
+    }
+    tmp = out_dir / "meta.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, out_dir / "meta.json")
+    return meta
+
+
+class DemPyramid:
+    """Memory-mapped pyramid levels + tile rendering (see build_pyramid for the layout)."""
+
+    __slots__ = ("meta", "min_zoom", "max_zoom", "vmin", "vmax", "_dir", "_levels", "_tiles", "_tiles_lock")
+
+    def __init__(self, pyramid_dir: Path, meta: dict):
+        self.meta = meta
+        self.min_zoom = int(meta["min_zoom"])
+        self.max_zoom = int(meta["max_zoom"])
+        self.vmin = float(meta["vmin"])
+        self.vmax = float(meta["vmax"]) if meta["vmax"] > meta["vmin"] else float(meta["vmin"]) + 1.0
+        self._dir = Path(pyramid_dir)
+        self._levels = {}
+        self._tiles = OrderedDict()  # (z, x, y, colormap, hillshade) -> PNG bytes, oldest first
+        self._tiles_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, pyramid_dir: Path):
+        """Open a built pyramid; None if meta.json is missing or from another version."""
+        try:
+            with open(Path(pyramid_dir) / "meta.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != PYRAMID_VERSION:
+            return None
+        return cls(pyramid_dir, meta)
+
+    def tilejson(self) -> dict:
+        b = self.meta["bounds"]
+        return {
+            "minzoom": self.min_zoom,
+            "maxzoom": self.max_zoom + MAX_OVERZOOM,
+            "max_native_zoom": self.max_zoom,
+            "bounds": [b["west"], b["south"], b["east"], b["north"]],
+            "tile_size": TILE_SIZE,
+            "vmin": self.vmin,
+            "vmax": self.vmax,
+            "colormaps": list(COLORMAPS),
+        }
+
+    def _level(self, z: int):
+        arr = self._levels.get(z)
+        if arr is None:
+            arr = self._levels[z] = np.load(self._dir / f"z{z}.npy", mmap_mode="r")
+        return arr
+
+    def _window(self, z: int, gx: int, gy: int, w: int, h: int):
+        """Elevations for global pixels [gx, gx+w) x [gy, gy+h) at level z; NaN outside the DEM."""
+        tx0, ty0, _, _ = self.meta["levels"][str(z)]
+        arr = self._level(z)
+        x0, y0 = gx - tx0 * TILE_SIZE, gy - ty0 * TILE_SIZE
+        out = np.full((h, w), np.nan, dtype=np.float32)
+        sx0, sy0 = max(x0, 0), max(y0, 0)
+        sx1, sy1 = min(x0 + w, arr.shape[1]), min(y0 + h, arr.shape[0])
+        if sx1 > sx0 and sy1 > sy0:
+            out[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = arr[sy0:sy1, sx0:sx1]
+        return out
+
+    def contains(self, z: int, x: int, y: int) -> bool:
+        if z < self.min_zoom or z > self.max_zoom + MAX_OVERZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return False
+        d = max(z - self.max_zoom, 0)
+        tx0, ty0, ntx, nty = self.meta["levels"][str(z - d)]
+        return tx0 <= (x >> d) < tx0 + ntx and ty0 <= (y >> d) < ty0 + nty
+
+    def elevation(self, z: int, x: int, y: int):
+        """(TILE_SIZE + 2)^2 elevations for tile z/x/y with a 1 px border (for hillshade gradients)."""
+        if z <= self.max_zoom:
+            return self._window(z, x * TILE_SIZE - 1, y * TILE_SIZE - 1, TILE_SIZE + 2, TILE_SIZE + 2)
+        from PIL import Image
+
+        # overzoom: upsample the covering part of the max level
+        d = z - self.max_zoom
+        n = TILE_SIZE >> d
+        src = self._window(self.max_zoom, (x * TILE_SIZE >> d) - 1, (y * TILE_SIZE >> d) - 1, n + 2, n + 2)
+        scale = TILE_SIZE / n
+        size = int(round((n + 2) * scale))
+        up = np.asarray(Image.fromarray(src, mode="F").resize((size, size), Image.BILINEAR))
+        b = int(round(scale)) - 1
+        return up[b:b + TILE_SIZE + 2, b:b + TILE_SIZE + 2]
+
+    def render(self, z: int, x: int, y: int, colormap: str = "gray", hillshade: bool = False) -> bytes:
+        """PNG bytes for tile z/x/y (transparent where there is no data); the last TILE_CACHE_SIZE are kept."""
+        key = (z, x, y, colormap, bool(hillshade))
+        with self._tiles_lock:
+            png = self._tiles.get(key)
+            if png is not None:
+                self._tiles.move_to_end(key)
+                return png
+        png = _render_tile(self, *key)
+        with self._tiles_lock:
+            self._tiles[key] = png
+            while len(self._tiles) > TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        return png
+
+
+def _hillshade(elev, cellsize: float, azimuth: float = 315.0, altitude: float = 45.0):
+    """Standard hillshade (0..1) of a bordered elevation window; returns the inner pixels."""
+    dzdy, dzdx = np.gradient(np.nan_to_num(elev, nan=np.nanmean(elev) if np.isfinite(elev).any() else 0.0), cellsize)
+    slope = np.arctan(np.hypot(dzdx, dzdy))
+    aspect = np.arctan2(dzdy, -dzdx)
+    az, alt = math.radians(360.0 - azimuth + 90.0), math.radians(altitude)
+    shade = np.sin(alt) * np.cos(slope) + np.cos(alt) * np.sin(slope) * np.cos(az - aspect)
+    return np.clip(shade, 0.0, 1.0)[1:-1, 1:-1]
+
+
+def _render_tile(pyramid: DemPyramid, z: int, x: int, y: int, colormap: str, hillshade: bool) -> bytes:
+    from PIL import Image
+
+    elev = pyramid.elevation(z, x, y)
+    inner = elev[1:-1, 1:-1]
+    valid = np.isfinite(inner)
+    norm = np.clip((np.nan_to_num(inner, nan=pyramid.vmin) - pyramid.vmin) / (pyramid.vmax - pyramid.vmin), 0.0, 1.0)
+    rgb = _LUTS[colormap][(norm * 255).astype(np.uint8)].astype(np.float32)
+    if hillshade:
+        lat = math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / 2 ** z)))
+        shade = _hillshade(elev, resolution(z) * math.cos(lat))
+        rgb *= (0.35 + 0.65 * shade)[:, :, None]
+    rgba = np.dstack([rgb.round().astype(np.uint8), np.where(valid, 255, 0).astype(np.uint8)])
+    buf = io.BytesIO()
+    Image.fromarray(rgba, mode="RGBA").save(buf, format="PNG")
+    return buf.getvalue()
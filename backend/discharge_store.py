@@ -0,0 +1,578 @@
+"""
+Columnar cache for discharge.xlsx, shared by backend/main.py and the root main.py.
+
+The workbook is opened once and both sheets are streamed: the "data" (or "Merged") sheet
+becomes one shared array of date ordinals plus a float32 matrix of stations x days
+(NaN = missing value), the "coordinates" sheet becomes the station list. The arrays are
+saved as .npy files in a sidecar folder next to the workbook (discharge.xlsx.cache/),
+with the station list in its meta.json, and are memory-mapped on later loads, so a cold
+API start does not go through openpyxl.
+The sidecar is keyed on the workbook's mtime, size and SHA-256 and is rebuilt only
+when the workbook changes.
+
+DischargeStore wraps those arrays for the API; [{date, value}] dicts are built only at
+response time, for the slice being returned.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+from array import array
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+CACHE_VERSION = 3
+DATA_SHEET_NAMES = ("data", "Merged", "Data", "merged")
+COORD_SHEET_NAMES = ("coordinates", "Coordinates", "COORDINATES")
+AGG_STEPS = ("daily", "weekly", "monthly")
+AGG_FUNCS = ("mean", "min", "max")
+SERIES_FORMATS = ("records", "columns", "base64")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Text date layouts accepted besides ISO (YYYY-MM-DD...)
+DATE_FORMATS = ("%Y/%m/%d", "%m/%d/%Y", "%m/%d/%y")
+
+logger = logging.getLogger(__name__)
+
+
+def _norm_station_id(val) -> str:
+    """Normalize station ID for matching (e.g. 1108000 -> '1108000')."""
+    if val is None:
+        return ""
+    return str(val).strip()
+
+
+def cache_dir_for(xlsx_path: Path) -> Path:
+    """Sidecar folder for a workbook: discharge.xlsx -> discharge.xlsx.cache/."""
+    return xlsx_path.with_name(xlsx_path.name + ".cache")
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _date_ordinal(cell):
+    """Date cell (datetime, date, 'YYYY-MM-DD...' or DATE_FORMATS text) -> proleptic ordinal, or None."""
+    if isinstance(cell, (datetime, date)):
+        return cell.toordinal()
+    text = str(cell).strip()
+    try:
+        return date.fromisoformat(text[:10]).toordinal()
+    except ValueError:
+        pass
+    day = text.split()[0] if text else ""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(day, fmt).toordinal()
+        except ValueError:
+            continue
+    return None
+
+
+def _cell_float(v) -> float:
+    if v is None:
+        return np.nan
+    try:
+        if str(v).strip() == "":
+            return np.nan
+        return float(v)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _find_sheet(wb, names):
+    for name in names:
+        if name in wb.sheetnames:
+            return wb[name]
+    return None
+
+
+def _parse_coordinate_rows(rows) -> list:
+    """Stream the coordinates sheet: STAID column + optional station name, lat, lon columns."""
+    raw_headers = next(rows, None)
+    if not raw_headers:
+        return []
+
+    def norm(s):
+        return (str(s).strip().lower().replace(" ", "") if s is not None else "")
+
+    staid_idx = staname_idx = lat_idx = lon_idx = None
+    for i, c in enumerate(raw_headers):
+        h = norm(c)
+        if h == "staid":
+            staid_idx = i
+        elif h in ("staname", "stationname") or "staname" in h or (c and "name" in str(c).lower() and "sta" in str(c).lower()):
+            staname_idx = i
+        elif h in ("lat", "latitude", "y"):
+            lat_idx = i
+        elif h in ("lon", "long", "longitude", "lng", "x"):
+            lon_idx = i
+    if staid_idx is None:
+        return []
+
+    def cell_coord(row, idx):
+        if idx is None or idx >= len(row) or row[idx] is None:
+            return None
+        try:
+            return float(row[idx])
+        except (ValueError, TypeError):
+            return None
+
+    out = []
+    for row in rows:
+        if not row or staid_idx >= len(row):
+            continue
+        staid = _norm_station_id(row[staid_idx])
+        if not staid:
+            continue
+        staname = None
+        if staname_idx is not None and staname_idx < len(row):
+            val = row[staname_idx]
+            if val is not None and str(val).strip():
+                staname = str(val).strip()
+        out.append({
+            "id": staid,
+            "name": staname if staname else staid,
+            "staname": staname,
+            "lat": cell_coord(row, lat_idx),
+            "lon": cell_coord(row, lon_idx),
+        })
+    return out
+
+
+def _parse_data_rows(rows):
+    """
+    Stream the data sheet (first row = station IDs, first column = date).
+    Returns (station_ids, dates, values): dates is int32 ordinals sorted ascending,
+    values is a C-contiguous float32 matrix with one row per station. Rows whose date
+    cell cannot be read as a date are left out and logged (count and first examples).
+    """
+    header = next(rows, None) or ()
+    columns = []  # (column index, station id); first occurrence of an ID wins
+    seen = set()
+    for col_idx, h in enumerate(header[1:], start=1):
+        sid = _norm_station_id(h)
+        if sid and sid not in seen:
+            seen.add(sid)
+            columns.append((col_idx, sid))
+    ordinals = array("l")
+    flat = array("f")  # row-major: one block of len(columns) values per day
+    dropped, examples = 0, []
+    for row in rows:
+        if not row or row[0] is None:
+            continue
+        ordinal = _date_ordinal(row[0])
+        if ordinal is None:
+            if any(v is not None for v in row[1:]):
+                dropped += 1
+                if len(examples) < 5:
+                    examples.append(str(row[0]))
+            continue
+        ordinals.append(ordinal)
+        n = len(row)
+        flat.extend(_cell_float(row[c]) if c < n else np.nan for c, _ in columns)
+
+    if dropped:
+        logger.warning("discharge data sheet: %d rows with an unreadable date skipped (e.g. %s)",
+                       dropped, ", ".join(repr(e) for e in examples))
+    station_ids = [sid for _, sid in columns]
+    dates = np.asarray(ordinals, dtype=np.int32)
+    values = np.frombuffer(flat, dtype=np.float32).reshape(len(dates), len(station_ids))
+    if len(dates) > 1 and np.any(dates[1:] < dates[:-1]):
+        order = np.argsort(dates, kind="stable")
+        dates, values = dates[order], values[order]
+    return station_ids, dates, np.ascontiguousarray(values.T)
+
+
+def parse_workbook(xlsx_path: Path):
+    """
+    Open the workbook once and stream both sheets (no list(iter_rows()) materialization).
+    Returns (stations, station_ids, dates, values). stations comes from the "coordinates"
+    sheet; without that sheet every data column is listed with null coordinates.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        data_sheet = _find_sheet(wb, DATA_SHEET_NAMES) or wb[wb.sheetnames[0]]
+        station_ids, dates, values = _parse_data_rows(data_sheet.iter_rows(values_only=True))
+        coord_sheet = _find_sheet(wb, COORD_SHEET_NAMES)
+        if coord_sheet is not None:
+            stations = _parse_coordinate_rows(coord_sheet.iter_rows(values_only=True))
+        else:
+            stations = [{"id": sid, "name": sid, "staname": None, "lat": None, "lon": None} for sid in station_ids]
+    finally:
+        wb.close()
+    return stations, station_ids, dates, values
+
+
+def _read_meta(cache_dir: Path):
+    try:
+        with open(cache_dir / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == CACHE_VERSION else None
+
+
+def _write_json(path: Path, obj):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _write_cache(cache_dir: Path, meta: dict, dates, values):
+    """Write arrays first and meta.json last, so a half-written cache is never trusted."""
+    cache_dir.mkdir(exist_ok=True)
+    (cache_dir / "meta.json").unlink(missing_ok=True)
+    for name, arr in (("dates", dates), ("values", values)):
+        tmp = cache_dir / f"{name}.npy.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, cache_dir / f"{name}.npy")
+    _write_json(cache_dir / "meta.json", meta)
+
+
+def _load_cache(cache_dir: Path, meta: dict):
+    dates = np.load(cache_dir / "dates.npy", mmap_mode="r")
+    values = np.load(cache_dir / "values.npy", mmap_mode="r")
+    station_ids = list(meta["station_ids"])
+    if values.shape != (len(station_ids), len(dates)):
+        raise ValueError("discharge cache shape mismatch")
+    return list(meta["stations"]), station_ids, dates, values
+
+
+def load_discharge_workbook(xlsx_path: Path):
+    """
+    Return (stations, station_ids, dates, values) for the workbook, using the sidecar cache
+    when it matches the workbook (same mtime+size, or same size+SHA-256 after a touch/copy).
+    Otherwise parse the workbook once and rewrite the cache. If the sidecar folder is not
+    writable the parsed data is still returned, just not persisted.
+    """
+    st = xlsx_path.stat()
+    cache_dir = cache_dir_for(xlsx_path)
+    meta = _read_meta(cache_dir)
+    digest = None
+    if meta is not None and meta.get("size") == st.st_size:
+        fresh = meta.get("mtime_ns") == st.st_mtime_ns
+        if not fresh:
+            digest = _file_sha256(xlsx_path)
+            fresh = meta.get("sha256") == digest
+        if fresh:
+            try:
+                loaded = _load_cache(cache_dir, meta)
+            except (OSError, ValueError, KeyError):
+                loaded = None
+            if loaded is not None:
+                if meta.get("mtime_ns") != st.st_mtime_ns:
+                    meta["mtime_ns"] = st.st_mtime_ns
+                    try:
+                        _write_json(cache_dir / "meta.json", meta)
+                    except OSError:
+                        pass
+                return loaded
+
+    stations, station_ids, dates, values = parse_workbook(xlsx_path)
+    meta = {
+        "version": CACHE_VERSION,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": digest or _file_sha256(xlsx_path),
+        "station_ids": station_ids,
+        "stations": stations,
+    }
+    try:
+        _write_cache(cache_dir, meta, dates, values)
+    except OSError:
+        pass
+    return stations, station_ids, dates, values
+
+
+def ordinals_to_iso(dates) -> list:
+    """Date ordinals -> ['YYYY-MM-DD', ...]."""
+    days = np.asarray(dates, dtype=np.int64) - _EPOCH_ORDINAL
+    return days.astype("datetime64[D]").astype(str).tolist()
+
+
+def iso_to_ordinal(value: str) -> int:
+    """'YYYY-MM-DD' (a longer ISO timestamp is cut to its date) -> ordinal; ValueError if invalid."""
+    try:
+        return date.fromisoformat(str(value).strip()[:10]).toordinal()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD") from None
+
+
+def _bin_keys(dates, step: str):
+    """Per-point bin key and per-bin label ordinal for daily / weekly (Monday) / monthly bins."""
+    dates = np.asarray(dates, dtype=np.int64)
+    if step == "daily":
+        return dates, lambda keys: keys
+    if step == "weekly":
+        # Ordinal 1 (0001-01-01) is a Monday, so weeks run Monday..Sunday
+        return (dates - 1) // 7, lambda keys: keys * 7 + 1
+    months = (dates - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return months, lambda keys: keys.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+
+
+def aggregate(dates, values, step: str, agg: str = "mean"):
+    """
+    Reduce a date-sorted series into daily/weekly/monthly bins with NaN-aware mean/min/max.
+    Returns (label_ordinals, values); bins with no valid values are NaN.
+    """
+    if step not in AGG_STEPS:
+        raise ValueError(f"Invalid step '{step}', expected one of {', '.join(AGG_STEPS)}")
+    if agg not in AGG_FUNCS:
+        raise ValueError(f"Invalid agg '{agg}', expected one of {', '.join(AGG_FUNCS)}")
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64), values
+    keys, to_label = _bin_keys(dates, step)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    if agg == "min":
+        out = np.fmin.reduceat(values, starts)
+    elif agg == "max":
+        out = np.fmax.reduceat(values, starts)
+    else:
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = np.where(counts > 0, sums / counts, np.nan)
+    return to_label(keys[starts]), out
+
+
+def values_to_json(values) -> list:
+    """
+    float32 values -> list of Python floats (None for NaN), rounded to float32 precision
+    (7 significant digits) so 45.2 is served as 45.2 and not 45.20000076293945.
+    """
+    v = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mag = np.floor(np.log10(np.abs(v)))
+    decimals = np.clip(6 - np.nan_to_num(mag, nan=0.0, posinf=0.0, neginf=0.0), 0, 15)
+    scale = 10.0 ** decimals
+    out = (np.round(v * scale) / scale).tolist()
+    return [None if x != x else x for x in out]
+
+
+def encode_columns(ordinals, columns: dict, fmt: str) -> dict:
+    """
+    Columnar series payload: {"dates": [...], <name>: [...]} for fmt "columns", or for "base64"
+    the dates as little-endian int32 days since 1970-01-01 and each column as little-endian
+    float32 (NaN = missing), base64-encoded.
+    """
+    if fmt == "base64":
+        days = np.asarray(ordinals, dtype=np.int64) - _EPOCH_ORDINAL
+        out = {"encoding": "base64", "count": len(days), "dates": base64.b64encode(days.astype("<i4").tobytes()).decode("ascii")}
+        for name, values in columns.items():
+            out[name] = base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii")
+        return out
+    out = {"dates": ordinals_to_iso(ordinals)}
+    for name, values in columns.items():
+        out[name] = values_to_json(values)
+    return out
+
+
+def check_format(fmt: str):
+    if fmt not in SERIES_FORMATS:
+        raise ValueError(f"Invalid format '{fmt}', expected one of {', '.join(SERIES_FORMATS)}")
+
+
+class DischargeSeries:
+    """One station's discharge: the store's shared date index plus this station's contiguous float32 row."""
+
+    __slots__ = ("station_id", "_store", "values")
+
+    def __init__(self, station_id: str, store, values):
+        self.station_id = station_id
+        self._store = store
+        self.values = values
+
+    @property
+    def dates(self):
+        return self._store.dates
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_records(self, start: int = 0, stop=None) -> list:
+        """Serialize positions [start:stop] to the API's [{date, value}] shape."""
+        return [
+            {"date": d, "value": v}
+            for d, v in zip(self._store.iso_dates(start, stop), values_to_json(self.values[start:stop]))
+        ]
+
+    def tail(self, limit=None) -> list:
+        """Last `limit` points as [{date, value}] (all points if limit is falsy)."""
+        n = len(self.values)
+        start = n - limit if limit and n > limit else 0
+        return self.to_records(start)
+
+    def query(self, start=None, end=None, step=None, agg="mean", limit=None, fmt="records"):
+        """
+        [{date, value}] for start..end (inclusive ISO dates, found by binary search),
+        optionally reduced to daily/weekly/monthly bins with `agg`. `limit` keeps the last N points.
+        fmt "columns" / "base64" returns encode_columns() output instead of records.
+        """
+        check_format(fmt)
+        if limit is not None and limit < 0:
+            raise ValueError(f"Invalid limit {limit}, expected a count >= 0")
+        lo, hi = self._store.index_range(start, end)
+        if step is None:
+            n = hi - lo
+            if limit and n > limit:
+                lo = hi - limit
+            if fmt == "records":
+                return self.to_records(lo, hi)
+            return encode_columns(self._store.dates[lo:hi], {"values": self.values[lo:hi]}, fmt)
+        labels, values = aggregate(self._store.dates[lo:hi], self.values[lo:hi], step, agg)
+        if limit and len(values) > limit:
+            labels, values = labels[-limit:], values[-limit:]
+        if fmt != "records":
+            return encode_columns(labels, {"values": values}, fmt)
+        return [{"date": d, "value": v} for d, v in zip(ordinals_to_iso(labels), values_to_json(values))]
+
+
+class DischargeStore:
+    """
+    All discharge series: one shared date-ordinal index and a stations x days float32 matrix
+    (usually memory-mapped from the sidecar cache). Behaves like a read-only mapping of
+    station ID -> DischargeSeries; JSON dicts are only built per response.
+    """
+
+    __slots__ = ("station_ids", "dates", "values", "_rows", "_iso")
+
+    def __init__(self, station_ids, dates, values):
+        self.station_ids = list(station_ids)
+        self.dates = dates
+        self.values = values
+        self._rows = {sid: i for i, sid in enumerate(self.station_ids)}
+        self._iso = None
+
+    def __len__(self):
+        return len(self.station_ids)
+
+    def __iter__(self):
+        return iter(self.station_ids)
+
+    def __contains__(self, station_id):
+        return station_id in self._rows
+
+    def __getitem__(self, station_id) -> DischargeSeries:
+        return DischargeSeries(station_id, self, self.values[self._rows[station_id]])
+
+    def keys(self):
+        return list(self.station_ids)
+
+    def index_range(self, start=None, end=None):
+        """Positions [lo, hi) of dates within start..end (ISO strings, inclusive), in O(log n)."""
+        lo, hi = 0, len(self.dates)
+        if start:
+            lo = int(np.searchsorted(self.dates, iso_to_ordinal(start), side="left"))
+        if end:
+            hi = int(np.searchsorted(self.dates, iso_to_ordinal(end), side="right"))
+        return lo, max(lo, hi)
+
+    def iso_dates(self, start: int = 0, stop=None) -> list:
+        """'YYYY-MM-DD' strings for index positions [start:stop], built once and shared by all stations."""
+        if self._iso is None:
+            self._iso = ordinals_to_iso(self.dates)
+        return self._iso[start:stop]
+
+
+def station_id_aliases(station_id) -> list:
+    """Every form a station is looked up by: raw, unpadded and 8-digit USGS-padded ('1108000' <-> '01108000')."""
+    sid = _norm_station_id(station_id)
+    if not sid:
+        return []
+    aliases = [sid]
+    if sid.isdigit():
+        unpadded = sid.lstrip("0") or "0"
+        for alias in (unpadded, unpadded.zfill(8)):
+            if alias not in aliases:
+                aliases.append(alias)
+    return aliases
+
+
+class StationRecord:
+    """One discharge station: display fields from the coordinates sheet plus its DischargeSeries (None if no data column)."""
+
+    __slots__ = ("id", "name", "staname", "lat", "lon", "series")
+
+    def __init__(self, station_id, name=None, staname=None, lat=None, lon=None, series=None):
+        self.id = station_id
+        self.name = name or station_id
+        self.staname = staname
+        self.lat = lat
+        self.lon = lon
+        self.series = series
+
+
+class StationIndex:
+    """
+    Station lookup built once per load: every alias of a station ID (raw, unpadded, padded)
+    maps to a single StationRecord, so endpoint lookups are one dict hit.
+    `stations` keeps the coordinates-sheet records in sheet order for listings.
+    """
+
+    __slots__ = ("stations", "_by_alias")
+
+    def __init__(self, stations, store=None):
+        self.stations = []
+        self._by_alias = {}
+        for s in stations:
+            rec = StationRecord(s["id"], s.get("name"), s.get("staname"), s.get("lat"), s.get("lon"))
+            self.stations.append(rec)
+            self._register(rec)
+        if store is None:
+            return
+        for sid in store:
+            rec = self.get(sid)
+            if rec is None or (rec.series is not None and rec.series.station_id != sid):
+                # No coordinates row, or a second data column for the same number: own record
+                rec = StationRecord(sid)
+                self._by_alias[sid] = rec
+                self._register(rec)
+            rec.series = store[sid]
+
+    def _register(self, rec: StationRecord):
+        for alias in station_id_aliases(rec.id):
+            self._by_alias.setdefault(alias, rec)
+
+    def get(self, station_id):
+        """StationRecord for any form of the ID, or None."""
+        sid = _norm_station_id(station_id)
+        rec = self._by_alias.get(sid)
+        if rec is None and sid.isdigit():
+            rec = self._by_alias.get(sid.lstrip("0") or "0")
+        return rec
+
+    def __len__(self):
+        return len(self.stations)
+
+
+class DischargeData:
+    """
+    One immutable snapshot of the workbook: coordinates-sheet station list, series store
+    and lookup index. Built in one pass and swapped in as a whole, so readers never see a
+    station list from one version of the file and series from another.
+    """
+
+    __slots__ = ("stations", "store", "index")
+
+    def __init__(self, stations, store: DischargeStore):
+        self.stations = stations
+        self.store = store
+        self.index = StationIndex(stations, store)
+
+    @classmethod
+    def load(cls, xlsx_path: Path):
+        stations, station_ids, dates, values = load_discharge_workbook(xlsx_path)
+        return cls(stations, DischargeStore(station_ids, dates, values))
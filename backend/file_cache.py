@@ -0,0 +1,113 @@
+"""
+File-keyed snapshot cache for the API backends.
+
+A FileSnapshotCache holds one immutable value derived from one or more files (e.g. the
+DischargeData built from discharge.xlsx) together with the files' (mtime, size) key.
+- Single flight: only one thread runs the loader; on the very first load the others wait
+  for it, on a reload they keep getting the previous (stale) snapshot meanwhile.
+- The (key, value) pair is swapped in with one assignment, so readers never see a mix.
+- Freshness is checked by a background thread every SWAT_CACHE_CHECK_INTERVAL seconds
+  (default 5) instead of a stat() per request. An interval of 0 checks on every get().
+- If a reload fails (e.g. the workbook is mid-save), the last good snapshot stays in
+  place and the reload is retried on the next check.
+"""
+import logging
+import os
+import threading
+
+DEFAULT_CHECK_INTERVAL = float(os.environ.get("SWAT_CACHE_CHECK_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+def file_key(paths) -> tuple:
+    """(path, mtime_ns, size) per path (None, None if missing); changes whenever any file does."""
+    key = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except OSError:
+            key.append((str(p), None, None))
+        else:
+            key.append((str(p), st.st_mtime_ns, st.st_size))
+    return tuple(key)
+
+
+class FileSnapshotCache:
+    """Single-flight cache of loader() keyed on the mtimes/sizes of `paths` (a list, or a callable returning one)."""
+
+    def __init__(self, paths, loader, check_interval=None):
+        self._paths = paths
+        self._loader = loader
+        self.check_interval = DEFAULT_CHECK_INTERVAL if check_interval is None else float(check_interval)
+        self._snapshot = None  # (key, value)
+        self._load_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _current_key(self) -> tuple:
+        return file_key(self._paths() if callable(self._paths) else self._paths)
+
+    @property
+    def version(self):
+        """File key of the snapshot currently served (None before the first load)."""
+        snap = self._snapshot
+        return snap[0] if snap is not None else None
+
+    def get(self):
+        """Current value. Loads on first use; later calls never block on a reload."""
+        snap = self._snapshot
+        if snap is None:
+            return self._load(block=True)[1]
+        if self.check_interval > 0:
+            self._ensure_watcher()
+        elif self._current_key() != snap[0]:
+            snap = self._load(block=False)
+        return snap[1]
+
+    def refresh(self):
+        """Reload now (blocking) if the files changed since the current snapshot; return the value."""
+        return self._load(block=True)[1]
+
+    def _load(self, block: bool):
+        if not self._load_lock.acquire(blocking=block):
+            return self._snapshot  # another thread is reloading: serve the stale snapshot
+        try:
+            snap = self._snapshot
+            key = self._current_key()
+            if snap is not None and snap[0] == key:
+                return snap
+            try:
+                value = self._loader()
+            except Exception:
+                if snap is None:
+                    raise
+                logger.exception("Reload failed; keeping previous snapshot")
+                return snap
+            self._snapshot = snap = (key, value)
+            return snap
+        finally:
+            self._load_lock.release()
+
+    def _ensure_watcher(self):
+        if self._watcher is not None:
+            return
+        with self._watcher_lock:
+            if self._watcher is None:
+                t = threading.Thread(target=self._watch, name="file-snapshot-watcher", daemon=True)
+                t.start()
+                self._watcher = t
+
+    def _watch(self):
+        while not self._stop.wait(self.check_interval):
+            snap = self._snapshot
+            if snap is None or self._current_key() != snap[0]:
+                try:
+                    self._load(block=True)
+                except Exception:
+                    logger.exception("Background reload failed")
+
+    def close(self):
+        """Stop the background watcher (the cached value stays usable)."""
+        self._stop.set()
@@ -0,0 +1,124 @@
+"""
+Grid metadata and nearest-point index for the SWAT+ climate grid (grids_domain.csv).
+
+GridSet loads the CSV once into NumPy arrays plus ID/name lookup dicts. Nearest-point
+search uses great-circle distance: points are placed on the unit sphere and indexed with
+scipy's cKDTree (O(log n) per query; chord length is monotonic in great-circle distance).
+Without scipy it falls back to a vectorized haversine scan over all points.
+"""
+import csv
+from pathlib import Path
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_xyz(lat, lon):
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km (broadcasts over arrays)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GridSet:
+    """All grid points: records for /api/grids, arrays for search, dicts for ID/name lookup."""
+
+    __slots__ = ("grids", "lat", "lon", "_by_id", "_by_name", "_tree")
+
+    def __init__(self, grids: list):
+        self.grids = grids
+        self.lat = np.array([g["lat"] for g in grids], dtype=np.float64)
+        self.lon = np.array([g["lon"] for g in grids], dtype=np.float64)
+        self._by_id = {}
+        self._by_name = {}
+        for g in grids:
+            self._by_id.setdefault(g["id"], g)
+            self._by_name.setdefault(g["name"], g)
+        self._tree = None
+        if grids:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                cKDTree = None
+            if cKDTree is not None:
+                self._tree = cKDTree(_unit_xyz(self.lat, self.lon))
+
+    @classmethod
+    def from_csv(cls, path: Path):
+        """Load grids_domain.csv (ID, NAME, LAT, LONG, ELEVATION); empty set if the file is missing."""
+        if not path.exists():
+            return cls([])
+        rows = []
+        with open(path) as f:
+            r = csv.DictReader(f)
+            for row in r:
+                rows.append({
+                    "id": row["ID"],
+                    "name": row["NAME"].strip(),
+                    "lat": float(row["LAT"]),
+                    "lon": float(row["LONG"]),
+                    "elev": float(row["ELEVATION"]),
+                })
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.grids)
+
+    def find(self, point_id: str):
+        """Grid by ID (e.g. 425405), NAME, or 'NA_'-prefixed ID; None if unknown."""
+        g = self._by_id.get(point_id)
+        if g is None:
+            pid = point_id.replace("NA_", "").strip()
+            g = self._by_id.get(pid) or self._by_name.get(point_id) or self._by_name.get(f"NA_{pid}")
+        return g
+
+    def in_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> list:
+        """Grids inside the lon/lat box (edges included)."""
+        mask = (self.lon >= min_lon) & (self.lon <= max_lon) & (self.lat >= min_lat) & (self.lat <= max_lat)
+        return [self.grids[i] for i in np.flatnonzero(mask).tolist()]
+
+    def in_polygon(self, ring) -> list:
+        """Grids inside a polygon ring of [lon, lat] pairs (even-odd rule, vectorized over all grids)."""
+        ring = np.asarray(ring, dtype=np.float64)
+        inside = np.zeros(len(self.grids), dtype=bool)
+        x, y = self.lon, self.lat
+        for (x1, y1), (x2, y2) in zip(ring, np.roll(ring, -1, axis=0)):
+            crosses = (y1 > y) != (y2 > y)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_at = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (x < x_at)
+        return [self.grids[i] for i in np.flatnonzero(inside).tolist()]
+
+    def nearest(self, lat: float, lon: float, k: int = 1, radius_km=None) -> list:
+        """Up to k (grid, distance_km) pairs, closest first, optionally only within radius_km."""
+        n = len(self.grids)
+        k = max(1, min(int(k), n))
+        if n == 0:
+            return []
+        if self._tree is not None:
+            upper = np.inf
+            if radius_km is not None:
+                # great-circle radius -> chord length on the unit sphere
+                upper = 2 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2) + 1e-12
+            chord, idx = self._tree.query(_unit_xyz(lat, lon)[0], k=k, distance_upper_bound=upper)
+            chord, idx = np.atleast_1d(chord), np.atleast_1d(idx)
+            keep = np.isfinite(chord)
+            chord, idx = chord[keep], idx[keep]
+            dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+        else:
+            all_dist = haversine_km(lat, lon, self.lat, self.lon)
+            idx = np.argpartition(all_dist, k - 1)[:k] if k < n else np.arange(n)
+            idx = idx[np.argsort(all_dist[idx], kind="stable")]
+            dist = all_dist[idx]
+            if radius_km is not None:
+                keep = dist <= radius_km
+                idx, dist = idx[keep], dist[keep]
+        return [(self.grids[i], float(d)) for i, d in zip(idx.tolist(), dist.tolist())]
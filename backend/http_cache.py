@@ -0,0 +1,74 @@
+"""
+HTTP caching and compression for the API backends.
+
+add_http_caching(app, versions) installs:
+- Conditional GET: for each path prefix in `versions` a function returns the version of
+  the data behind it (normally a FileSnapshotCache.version, i.e. the source files'
+  mtimes/sizes). The ETag is a hash of that version plus the request path and query, so
+  it changes exactly when the served snapshot does. It is weak (W/"..."): the gzipped and
+  the identity body of a URL share it, which a strong ETag must not. A request whose
+  If-None-Match matches gets 304 without running the endpoint; the 304 repeats the ETag
+  and "Vary: Accept-Encoding", since the 200 may have been gzipped. Versioned responses
+  carry "Cache-Control: no-cache" (revalidate every time) unless the endpoint set its own.
+- Gzip (Starlette's GZipMiddleware) for responses above GZIP_MIN_SIZE bytes.
+"""
+import hashlib
+import os
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response
+
+GZIP_MIN_SIZE = int(os.environ.get("SWAT_GZIP_MIN_SIZE", "1024"))
+
+
+def make_etag(version, path: str, query: str) -> str:
+    digest = hashlib.sha1(repr((version, path, query)).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:24]}"'
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2), as If-None-Match uses."""
+    tags = [_opaque(t.strip()) for t in header.split(",")]
+    return "*" in tags or _opaque(etag) in tags
+
+
+def add_http_caching(app, versions, gzip_min_size: int = GZIP_MIN_SIZE):
+    """
+    versions: [(path prefix, fn(request) -> hashable version or None)]; the first matching
+    prefix wins. A None version (e.g. data not loaded yet) means no ETag for that request.
+    """
+
+    def version_for(request):
+        path = request.url.path
+        for prefix, fn in versions:
+            if path.startswith(prefix):
+                return fn(request)
+        return None
+
+    @app.middleware("http")
+    async def conditional_get(request, call_next):
+        if request.method not in ("GET", "HEAD"):
+            return await call_next(request)
+        path, query = request.url.path, request.url.query
+        version = version_for(request)
+        if version is not None:
+            etag = make_etag(version, path, query)
+            if _etag_matches(request.headers.get("if-none-match", ""), etag):
+                # Same validators / Vary as the 200 would carry (GZip only adds Vary to bodies it compresses)
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"})
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        # The endpoint may just have loaded the data: take the version it was served from
+        version = version_for(request)
+        if version is not None:
+            response.headers["ETag"] = make_etag(version, path, query)
+            if "cache-control" not in response.headers:
+                response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    app.add_middleware(GZipMiddleware, minimum_size=gzip_min_size)
@@ -0,0 +1,25 @@
+"""
+JSON response class for the API backends.
+
+FastJSONResponse renders with orjson when it is installed (falls back to compact stdlib
+json). Endpoints with large payloads return it directly, which also skips FastAPI's
+jsonable_encoder pass over every nested dict; the payloads are built from plain
+str/float/int/None values (see values_to_json), so no encoding step is needed.
+"""
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson if available."""
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
@@ -4,7 +4,6 @@ Serves discharge stations and time series from discharge.xlsx. No watershed or D
 """
 import os
 import sys
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -14,9 +13,21 @@ if str(_THIS_DIR) not in sys.path:
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from openpyxl import load_workbook
 
-app = FastAPI(title="Hydrological Modeling API", description="Discharge stations and time series")
+from discharge_store import DischargeData
+from file_cache import FileSnapshotCache
+from http_cache import add_http_caching
+from json_response import FastJSONResponse
+
+app = FastAPI(
+    title="Hydrological Modeling API",
+    description="Discharge stations and time series",
+    default_response_class=FastJSONResponse,
+)
+
+# ETag from the discharge.xlsx snapshot (304 on If-None-Match) + gzip; see http_cache.py.
+# Added before CORS so that 304 responses also get CORS headers.
+add_http_caching(app, [("/api/discharge/", lambda request: _discharge_cache.version)])
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,136 +47,41 @@ if not DISCHARGE_FILE.exists():
 if not DISCHARGE_FILE.exists():
     DISCHARGE_FILE = _resolve_dir / "discharge.xls"
 
-_discharge_cache = {"mtime": None, "stations": None, "series": None, "station_ids": None}
+
+def _load_discharge_snapshot():
+    return DischargeData.load(DISCHARGE_FILE) if DISCHARGE_FILE.exists() else None
+
+
+# DischargeData snapshot for discharge.xlsx: single-flight reload, mtime checked in the background
+# every SWAT_CACHE_CHECK_INTERVAL seconds (see file_cache.py)
+_discharge_cache = FileSnapshotCache([DISCHARGE_FILE], _load_discharge_snapshot)
 
 
-def _norm_station_id(val) -> str:
-    if val is None:
-        return ""
-    return str(val).strip()
+def load_discharge():
+    """Return the current DischargeData snapshot for discharge.xlsx (or None if the file is missing)."""
+    return _discharge_cache.get()
 
 
 def load_discharge_data():
-    if not DISCHARGE_FILE.exists():
+    """Return (station_ids, DischargeStore) from the 'data' or 'Merged' sheet, or (None, None)."""
+    data = load_discharge()
+    if data is None or not data.store.station_ids:
         return None, None
-    mtime = DISCHARGE_FILE.stat().st_mtime
-    if _discharge_cache["mtime"] == mtime and _discharge_cache["series"] is not None:
-        return _discharge_cache["station_ids"], _discharge_cache["series"]
-    wb = load_workbook(DISCHARGE_FILE, read_only=True, data_only=True)
-    data_sheet = None
-    for name in ("data", "Merged", "Data", "merged"):
-        if name in wb.sheetnames:
-            data_sheet = wb[name]
-            break
-    if data_sheet is None:
-        data_sheet = wb[wb.sheetnames[0]]
-    rows = list(data_sheet.iter_rows(values_only=True))
-    wb.close()
-    if not rows:
-        return None, None
-    header = rows[0]
-    station_ids = [_norm_station_id(h) for h in header[1:]]
-    series = {}
-    for st_id in station_ids:
-        if st_id:
-            series[st_id] = []
-    for row in rows[1:]:
-        if not row:
-            continue
-        cell0 = row[0]
-        if cell0 is None:
-            continue
-        if isinstance(cell0, datetime):
-            date_str = cell0.strftime("%Y-%m-%d")
-        else:
-            date_str = str(cell0).strip()[:10]
-        for i, st_id in enumerate(station_ids):
-            if not st_id:
-                continue
-            col_idx = i + 1
-            if col_idx >= len(row):
-                continue
-            try:
-                v = row[col_idx]
-                val = float(v) if v is not None and str(v).strip() != "" else None
-            except (ValueError, TypeError):
-                val = None
-            series[st_id].append({"date": date_str, "value": val})
-    _discharge_cache["mtime"] = mtime
-    _discharge_cache["station_ids"] = station_ids
-    _discharge_cache["series"] = series
-    return station_ids, series
+    return data.store.station_ids, data.store
 
 
 def load_discharge_coordinates():
-    if not DISCHARGE_FILE.exists():
-        return []
-    mtime = DISCHARGE_FILE.stat().st_mtime
-    if _discharge_cache["mtime"] == mtime and _discharge_cache["stations"] is not None:
-        return _discharge_cache["stations"]
-    wb = load_workbook(DISCHARGE_FILE, read_only=True, data_only=True)
-    coord_sheet = None
-    for name in ("coordinates", "Coordinates", "COORDINATES"):
-        if name in wb.sheetnames:
-            coord_sheet = wb[name]
-            break
-    if coord_sheet is None:
-        wb.close()
-        station_ids, _ = load_discharge_data()
-        if station_ids:
-            out = [{"id": sid, "name": sid, "staname": None, "lat": None, "lon": None} for sid in station_ids if sid]
-            _discharge_cache["stations"] = out
-            return out
-        return []
-    rows = list(coord_sheet.iter_rows(values_only=True))
-    wb.close()
-    if not rows:
-        return []
-    raw_headers = rows[0]
-
-    def norm(s):
-        return (str(s).strip().lower().replace(" ", "") if s is not None else "")
-
-    staid_idx = staname_idx = lat_idx = lon_idx = None
-    for i, c in enumerate(raw_headers):
-        h = norm(c)
-        if h == "staid":
-            staid_idx = i
-        elif h in ("staname", "stationname") or "staname" in h or (c and "name" in str(c).lower() and "sta" in str(c).lower()):
-            staname_idx = i
-        elif h in ("lat", "latitude", "y"):
-            lat_idx = i
-        elif h in ("lon", "long", "longitude", "lng", "x"):
-            lon_idx = i
-    if staid_idx is None:
-        return []
-    out = []
-    for row in rows[1:]:
-        if staid_idx >= len(row):
-            continue
-        staid = _norm_station_id(row[staid_idx])
-        if not staid:
-            continue
-        staname = None
-        if staname_idx is not None and staname_idx < len(row) and row[staname_idx]:
-            staname = str(row[staname_idx]).strip()
-        name = staname if staname else staid
-        lat = None
-        lon = None
-        if lat_idx is not None and lat_idx < len(row) and row[lat_idx] is not None:
-            try:
-                lat = float(row[lat_idx])
-            except (ValueError, TypeError):
-                pass
-        if lon_idx is not None and lon_idx < len(row) and row[lon_idx] is not None:
-            try:
-                lon = float(row[lon_idx])
-            except (ValueError, TypeError):
-                pass
-        out.append({"id": staid, "name": name, "staname": staname, "lat": lat, "lon": lon})
-    load_discharge_data()
-    _discharge_cache["stations"] = out
-    return out
+    """Return station dicts (id, name, staname, lat, lon) from the 'coordinates' sheet; without that sheet, every data column with null coords."""
+    data = load_discharge()
+    return data.stations if data is not None else []
+
+
+def load_discharge_index():
+    """Station lookup index (padded/unpadded/raw ID -> coordinates + series), or None if no discharge data."""
+    data = load_discharge()
+    if data is None or not data.store.station_ids:
+        return None
+    return data.index
 
 
 @app.get("/")
@@ -205,25 +121,24 @@ def get_discharge_stations():
 @app.get("/api/discharge/station/{station_id}")
 def get_discharge_station(
     station_id: str,
-    limit: Optional[int] = Query(50000, description="Max number of points to return"),
+    limit: Optional[int] = Query(50000, ge=0, description="Max number of points to return (last N)"),
+    start: Optional[str] = Query(None, description="First date YYYY-MM-DD (inclusive)"),
+    end: Optional[str] = Query(None, description="Last date YYYY-MM-DD (inclusive)"),
+    step: Optional[str] = Query(None, description="Aggregate into daily, weekly or monthly bins"),
+    agg: str = Query("mean", description="Bin reduction when step is set: mean, min or max"),
+    fmt: str = Query("records", alias="format", description="records ([{date, value}]), columns ({dates, values}) or base64 (float32)"),
 ):
-    _, series = load_discharge_data()
-    if series is None:
+    index = load_discharge_index()
+    if index is None:
         raise HTTPException(status_code=404, detail="Discharge data not loaded")
-    sid_norm = _norm_station_id(station_id)
-    if sid_norm not in series:
-        for k in series:
-            if _norm_station_id(k) == sid_norm or k == station_id:
-                sid_norm = k
-                break
-        else:
-            raise HTTPException(status_code=404, detail=f"Station '{station_id}' not found")
-    data = series[sid_norm]
-    if limit and len(data) > limit:
-        data = data[-limit:]
-    stations = load_discharge_coordinates()
-    display_name = next((s["name"] for s in stations if _norm_station_id(s["id"]) == sid_norm), sid_norm)
-    return {"id": sid_norm, "name": display_name, "discharge": data}
+    station = index.get(station_id)
+    if station is None or station.series is None:
+        raise HTTPException(status_code=404, detail=f"Station '{station_id}' not found")
+    try:
+        data = station.series.query(start=start, end=end, step=step, agg=agg, limit=limit, fmt=fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"id": station.series.station_id, "name": station.name, "discharge": data})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+"""
+Watershed boundary (maps/watershed_WBDHU8.shp) for /api/watershed.
+
+WatershedLayer parses the shapefile once with pyshp into per-ring NumPy coordinate arrays
+(main.py caches it, keyed on the .shp/.dbf mtimes). Douglas-Peucker simplified versions
+are built on demand per zoom level (one screen pixel in degrees; an explicit tolerance is
+snapped to the nearest level) and kept as ready-to-send JSON bytes, so a zoomed-out map
+gets kilobytes instead of the full-resolution HUC8 outlines.
+"""
+import json
+import math
+import struct
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+MAX_ZOOM = 22
+TILE_SIZE = 256
+
+# GeoJSON type -> nesting depth of its coordinate lines (0 = not simplified)
+_LINE_DEPTH = {
+    "Point": 0,
+    "MultiPoint": 0,
+    "LineString": 1,
+    "MultiLineString": 2,
+    "Polygon": 2,
+    "MultiPolygon": 3,
+}
+
+
+def tolerance_for_zoom(zoom: int) -> float:
+    """Simplification tolerance (degrees) of one Web Mercator pixel at `zoom`."""
+    return 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def snap_tolerance(tolerance) -> float:
+    """
+    Tolerance rounded (in log scale) to the nearest zoom level's, so the simplified
+    versions are cached for at most MAX_ZOOM + 2 keys whatever clients send; None/0 -> 0.
+    """
+    if not tolerance or tolerance <= 0:
+        return 0.0
+    zoom = round(math.log2(tolerance_for_zoom(0) / tolerance))
+    return tolerance_for_zoom(min(max(zoom, 0), MAX_ZOOM))
+
+
+def douglas_peucker(points, tolerance: float):
+    """Keep-mask of a Douglas-Peucker simplification of an (n, 2) array (first/last always kept)."""
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        a, b = points[i], points[j]
+        seg = points[i + 1:j] - a
+        dx, dy = b - a
+        length = math.hypot(dx, dy)
+        if length == 0.0:  # closed ring: distance to the start point
+            dist = np.hypot(seg[:, 0], seg[:, 1])
+        else:
+            dist = np.abs(dx * seg[:, 1] - dy * seg[:, 0]) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return keep
+
+
+def _shape_to_geojson_geom(shape):
+    """Convert pyshp shape to GeoJSON geometry dict."""
+    if shape.shapeType not in (3, 5):  # POLYLINE, POLYGON
+        if shape.shapeType == 1:  # POINT
+            return {"type": "Point", "coordinates": shape.points[0]}
+        return None
+    parts = list(shape.parts) + [len(shape.points)]
+    rings = [shape.points[parts[i] : parts[i + 1]] for i in range(len(parts) - 1)]
+    if shape.shapeType == 5:  # POLYGON
+        return {"type": "Polygon", "coordinates": rings}
+    return {"type": "MultiLineString", "coordinates": rings}
+
+
+def _to_arrays(coords, depth: int):
+    """Nested coordinate lists -> (n, 2) arrays per line; empty lines (and parts left empty) are skipped."""
+    if depth == 1:
+        if len(coords) == 0:
+            return np.empty((0, 2), dtype=np.float64)
+        return np.asarray(coords, dtype=np.float64)[:, :2]
+    parts = [_to_arrays(c, depth - 1) for c in coords if len(c)]
+    return [p for p in parts if len(p)]
+
+
+def _simplify(coords, depth: int, tolerance: float, decimals, is_polygon: bool):
+    """Simplified coordinate lists; collapsed polygon holes are dropped, collapsed outer rings kept as is."""
+    if depth > 1:
+        ring_level = is_polygon and depth == 2
+        out = []
+        for idx, c in enumerate(coords):
+            s = _simplify(c, depth - 1, tolerance, decimals, is_polygon)
+            if ring_level and len(s) < 4:
+                if idx > 0:
+                    continue
+                s = _round(c, decimals)
+            out.append(s)
+        return out
+    pts = coords[douglas_peucker(coords, tolerance)] if tolerance > 0 else coords
+    return _round(pts, decimals)
+
+
+def _round(pts, decimals):
+    return (np.round(pts, decimals) if decimals is not None else pts).tolist()
+
+
+class WatershedLayer:
+    """Parsed watershed features (properties + NumPy coordinates) with cached simplified GeoJSON."""
+
+    __slots__ = ("features",)
+
+    def __init__(self, features: list):
+        self.features = features  # [(properties, geometry type, coordinate arrays)]
+
+    @classmethod
+    def from_shapefile(cls, shp_path: Path):
+        """Read the shapefile with pyshp; None if it is missing, unreadable or pyshp is not installed."""
+        if not Path(shp_path).exists():
+            return None
+        try:
+            import shapefile
+        except ImportError:
+            return None
+        try:
+            sf = shapefile.Reader(str(shp_path))
+            field_names = [f[0] for f in sf.fields[1:]]
+            features = []
+            for shape, record in zip(sf.shapes(), sf.records()):
+                if hasattr(shape, "__geo_interface__"):
+                    geom = shape.__geo_interface__
+                else:
+                    geom = _shape_to_geojson_geom(shape)
+                if geom is None:
+                    continue
+                props = dict(zip(field_names, record)) if field_names else {}
+                depth = _LINE_DEPTH.get(geom["type"], 0)
+                coords = _to_arrays(geom["coordinates"], depth) if depth else geom["coordinates"]
+                features.append((props, geom["type"], coords))
+            return cls(features)
+        except (OSError, ValueError, struct.error, shapefile.ShapefileException):
+            return None
+
+    def __len__(self):
+        return len(self.features)
+
+    def vertex_count(self) -> int:
+        def count(c, depth):
+            return len(c) if depth == 1 else sum(count(x, depth - 1) for x in c)
+
+        return sum(count(c, _LINE_DEPTH[t]) for _, t, c in self.features if _LINE_DEPTH.get(t))
+
+    def geojson_bytes(self, tolerance=None) -> bytes:
+        """
+        FeatureCollection as JSON bytes, simplified with `tolerance` degrees snapped to the
+        nearest zoom level (None/0 = full resolution).
+        """
+        return _encode(self, snap_tolerance(tolerance))
+
+
+@lru_cache(maxsize=64)
+def _encode(layer: WatershedLayer, tolerance: float) -> bytes:
+    # Round to ~1/10 of the tolerance; full resolution keeps the shapefile's coordinates
+    decimals = min(max(math.ceil(-math.log10(tolerance)) + 1, 0), 8) if tolerance > 0 else None
+    features = []
+    for props, gtype, coords in layer.features:
+        depth = _LINE_DEPTH.get(gtype, 0)
+        if depth:
+            coords = _simplify(coords, depth, tolerance, decimals, gtype in ("Polygon", "MultiPolygon"))
+        features.append({"type": "Feature", "properties": props, "geometry": {"type": gtype, "coordinates": coords}})
+    return json.dumps({"type": "FeatureCollection", "features": features}, default=str).encode("utf-8")
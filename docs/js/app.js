@@ -362,7 +362,7 @@
     if (dischargeData) return dischargeData;
     if (API) {
       try {
-        const res = await fetch(API + "/api/discharge/stations?_=" + Date.now());
+        const res = await fetch(API + "/api/discharge/stations");
         if (res.ok) {
           const geojson = await res.json();
           const stations = [];
@@ -390,6 +390,20 @@
       var segs = path.split("/").filter(Boolean);
       if (segs.length > 0) base = "/" + segs[0] + "/";
     }
+    // Sharded export (export_discharge_data.py --shards): station list now, series per click
+    var shardBase = base + "data/discharge/";
+    try {
+      var idxRes = await fetch(shardBase + "index.json");
+      if (idxRes.ok) {
+        var index = await idxRes.json();
+        var shards = {};
+        (index.shards || []).forEach(function (s) { shards[String(s.id)] = shardBase + s.file; });
+        dischargeData = { stations: index.stations || [], series: {}, shards: shards };
+        return dischargeData;
+      }
+    } catch (e) {
+      console.warn("No discharge shards, loading full data:", e.message);
+    }
     var dataUrl = base + "data/discharge_data.json";
     try {
       var res = await fetch(dataUrl);
@@ -440,6 +454,19 @@
       const s = dischargeData.series[stationId] || dischargeData.series[String(stationId)];
       if (s && s.length > 0) return s;
     }
+    var shardUrl = dischargeData && dischargeData.shards && dischargeData.shards[String(stationId)];
+    if (shardUrl) {
+      try {
+        const res = await fetch(shardUrl);
+        if (res.ok) {
+          const series = await res.json();
+          dischargeData.series[String(stationId)] = series;
+          return series;
+        }
+      } catch (e) {
+        console.warn("Shard fetch failed:", e.message);
+      }
+    }
     if (API) {
       try {
         const res = await fetch(API + "/api/discharge/station/" + encodeURIComponent(stationId) + "?limit=50000");
@@ -3,31 +3,61 @@ SWAT+ Climate & Flow Viewer – Backend API (read-only).
 Serves grid locations and time series (precipitation, temperature, etc.) for the map frontend.
 Discharge data from discharge.xlsx: "data" sheet (or "Merged") + "coordinates" sheet (STAID, lat, lon).
 """
-import csv
 import os
 import sys
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
+from urllib.parse import unquote
 
 # Ensure we load from this file's directory (avoid wrong main.py from elsewhere)
 _THIS_DIR = Path(__file__).resolve().parent
 if str(_THIS_DIR) not in sys.path:
     sys.path.insert(0, str(_THIS_DIR))
+# Shared discharge cache module lives in backend/
+if str(_THIS_DIR / "backend") not in sys.path:
+    sys.path.insert(1, str(_THIS_DIR / "backend"))
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
-from openpyxl import load_workbook
+from pydantic import BaseModel, Field
+
+from climate_store import STORE_DIR_NAME, VARIABLES, ClimateSeries, common_window, open_series, ordinal_range_iso, source_path, stack
+from dem_tiles import COLORMAPS, DemPyramid
+from discharge_store import DischargeData, check_format, iso_to_ordinal, values_to_json
+from file_cache import FileSnapshotCache, file_key
+from grid_index import GridSet
+from http_cache import add_http_caching
+from json_response import FastJSONResponse
+from watershed import MAX_ZOOM, WatershedLayer, tolerance_for_zoom
+
+app = FastAPI(
+    title="SWAT+ Climate Viewer API",
+    description="Read-only API for grid climate data",
+    default_response_class=FastJSONResponse,
+)
 
-app = FastAPI(title="SWAT+ Climate Viewer API", description="Read-only API for grid climate data")
+# ETag from the data snapshot behind each endpoint (304 on If-None-Match) + gzip; see
+# backend/http_cache.py. Added before CORS so that 304 responses also get CORS headers.
+add_http_caching(
+    app,
+    [
+        ("/api/discharge/", lambda request: _discharge_cache.version),
+        ("/api/grids", lambda request: _grid_cache.version),
+        ("/api/search", lambda request: _grid_cache.version),
+        ("/api/point/", lambda request: _point_version(request)),
+        ("/api/watershed", lambda request: _watershed_cache.version),
+        ("/api/dem/tiles", lambda request: _dem_pyramid_cache.version),
+        ("/api/dem/", lambda request: _dem_version()),
+    ],
+)
 
 # Allow frontend on GitHub Pages or any origin
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False,
-    allow_methods=["GET"],
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
 )
 
@@ -40,6 +70,8 @@ if not DATA_DIR.is_dir():
 if not DATA_DIR.is_dir():
     # Local dev: sibling repo swat_climate_download
     DATA_DIR = Path(__file__).resolve().parent.parent.parent / "swat_climate_download" / "climate_data" / "domain_41_42.5_70.5_72.5"
+# Binary copies of pcp/tmp/slr (see backend/climate_store.py); default DATA_DIR/.climate_store
+CLIMATE_STORE_DIR = Path(os.environ.get("SWAT_CLIMATE_STORE_DIR", str(DATA_DIR / STORE_DIR_NAME)))
 
 # Discharge Excel: project root discharge.xlsx or discharge.xls (use .xlsx path; openpyxl needs .xlsx)
 _resolve_dir = Path(__file__).resolve().parent.parent
@@ -63,291 +95,115 @@ def _maps_dir():
 MAPS_DIR = _maps_dir()
 WATERSHED_SHP = MAPS_DIR / "watershed_WBDHU8.shp"
 DEM_DIR = MAPS_DIR / "dem"
+# XYZ tile pyramid built from DEM_DIR by scripts/build_dem_tiles.py
+DEM_PYRAMID_DIR = Path(os.environ.get("SWAT_DEM_PYRAMID_DIR", str(MAPS_DIR / "dem_pyramid")))
+
+
+def _load_discharge_snapshot():
+    return DischargeData.load(DISCHARGE_FILE) if DISCHARGE_FILE.exists() else None
+
 
-# In-memory cache for discharge data (cleared when file changes)
-_discharge_cache = {"mtime": None, "stations": None, "series": None, "station_ids": None}
+# DischargeData snapshot for discharge.xlsx: single-flight reload, mtime checked in the background
+# every SWAT_CACHE_CHECK_INTERVAL seconds (see file_cache.py)
+_discharge_cache = FileSnapshotCache([DISCHARGE_FILE], _load_discharge_snapshot)
 
 
-def _norm_station_id(val) -> str:
-    """Normalize station ID for matching (e.g. 1108000 -> '1108000')."""
-    if val is None:
-        return ""
-    return str(val).strip()
+def load_discharge():
+    """Return the current DischargeData snapshot for discharge.xlsx (or None if the file is missing)."""
+    return _discharge_cache.get()
 
 
 def load_discharge_data():
-    """Load discharge time series from 'data' or 'Merged' sheet. First row = station IDs, first col = date."""
-    if not DISCHARGE_FILE.exists():
+    """Return (station_ids, DischargeStore) from the 'data' or 'Merged' sheet, or (None, None)."""
+    data = load_discharge()
+    if data is None or not data.store.station_ids:
         return None, None
-    mtime = DISCHARGE_FILE.stat().st_mtime
-    if _discharge_cache["mtime"] == mtime and _discharge_cache["series"] is not None:
-        return _discharge_cache["station_ids"], _discharge_cache["series"]
-    wb = load_workbook(DISCHARGE_FILE, read_only=True, data_only=True)
-    data_sheet = None
-    for name in ("data", "Merged", "Data", "merged"):
-        if name in wb.sheetnames:
-            data_sheet = wb[name]
-            break
-    if data_sheet is None:
-        data_sheet = wb[wb.sheetnames[0]]
-    rows = list(data_sheet.iter_rows(values_only=True))
-    wb.close()
-    if not rows:
-        return None, None
-    header = rows[0]
-    # First column is date; rest are station IDs (location names)
-    station_ids = [_norm_station_id(h) for h in header[1:]]
-    series = {}  # station_id -> list of {date, value}
-    for st_id in station_ids:
-        if st_id:
-            series[st_id] = []
-    date_col_idx = 0
-    for row in rows[1:]:
-        if not row:
-            continue
-        cell0 = row[date_col_idx]
-        if cell0 is None:
-            continue
-        if isinstance(cell0, datetime):
-            date_str = cell0.strftime("%Y-%m-%d")
-        else:
-            try:
-                date_str = str(cell0).strip()[:10]
-            except Exception:
-                continue
-        for i, st_id in enumerate(station_ids):
-            if not st_id:
-                continue
-            col_idx = i + 1
-            if col_idx >= len(row):
-                continue
-            try:
-                v = row[col_idx]
-                if v is not None and str(v).strip() != "":
-                    val = float(v)
-                else:
-                    val = None
-            except (ValueError, TypeError):
-                val = None
-            series[st_id].append({"date": date_str, "value": val})
-    _discharge_cache["mtime"] = mtime
-    _discharge_cache["station_ids"] = station_ids
-    _discharge_cache["series"] = series
-    return station_ids, series
+    return data.store.station_ids, data.store
 
 
 def load_discharge_coordinates():
-    """Load station coordinates from 'coordinates' sheet. STAID column + lat/lon columns."""
-    if not DISCHARGE_FILE.exists():
-        return []
-    mtime = DISCHARGE_FILE.stat().st_mtime
-    if _discharge_cache["mtime"] == mtime and _discharge_cache["stations"] is not None:
-        return _discharge_cache["stations"]
-    wb = load_workbook(DISCHARGE_FILE, read_only=True, data_only=True)
-    coord_sheet = None
-    for name in ("coordinates", "Coordinates", "COORDINATES"):
-        if name in wb.sheetnames:
-            coord_sheet = wb[name]
-            break
-    if coord_sheet is None:
-        wb.close()
-        station_ids, _ = load_discharge_data()
-        # No coordinates sheet: return stations with null coords so frontend can still list them
-        if station_ids:
-            out = [{"id": sid, "name": sid, "staname": None, "lat": None, "lon": None} for sid in station_ids if sid]
-            _discharge_cache["stations"] = out
-            return out
-        return []
-    rows = list(coord_sheet.iter_rows(values_only=True))
-    wb.close()
-    if not rows:
-        return []
-    raw_headers = rows[0]
-
-    def norm(s):
-        return (str(s).strip().lower().replace(" ", "") if s is not None else "")
-
-    staid_idx = None
-    staname_idx = None
-    lat_idx = None
-    lon_idx = None
-    for i, c in enumerate(raw_headers):
-        h = norm(c)
-        if h == "staid":
-            staid_idx = i
-        elif h in ("staname", "stationname") or "staname" in h or (c and "name" in str(c).lower() and "sta" in str(c).lower()):
-            staname_idx = i
-        elif h in ("lat", "latitude", "y"):
-            lat_idx = i
-        elif h in ("lon", "long", "longitude", "lng", "x"):
-            lon_idx = i
-    if staid_idx is None:
-        return []
-    out = []
-    for row in rows[1:]:
-        if staid_idx >= len(row):
-            continue
-        staid = _norm_station_id(row[staid_idx])
-        if not staid:
-            continue
-        staname = None
-        if staname_idx is not None and staname_idx < len(row):
-            val = row[staname_idx]
-            if val is not None and str(val).strip():
-                staname = str(val).strip()
-        name = staname if staname else staid
-        lat = None
-        lon = None
-        if lat_idx is not None and lat_idx < len(row) and row[lat_idx] is not None:
-            try:
-                lat = float(row[lat_idx])
-            except (ValueError, TypeError):
-                pass
-        if lon_idx is not None and lon_idx < len(row) and row[lon_idx] is not None:
-            try:
-                lon = float(row[lon_idx])
-            except (ValueError, TypeError):
-                pass
-        out.append({"id": staid, "name": name, "staname": staname, "lat": lat, "lon": lon})
-    load_discharge_data()  # ensure cache mtime is set
-    _discharge_cache["stations"] = out
-    return out
-
-
-def load_watershed_geojson():
-    """Load watershed shapefile and return GeoJSON FeatureCollection."""
-    if not WATERSHED_SHP.exists():
-        return None
-    try:
-        import shapefile
-    except ImportError:
-        return None
-    try:
-        sf = shapefile.Reader(str(WATERSHED_SHP))
-        field_names = [f[0] for f in sf.fields[1:]]
-        features = []
-        for shape, record in zip(sf.shapes(), sf.records()):
-            if hasattr(shape, "__geo_interface__"):
-                geom = shape.__geo_interface__
-            else:
-                geom = _shape_to_geojson_geom(shape)
-            if geom is None:
-                continue
-            props = dict(zip(field_names, record)) if field_names else {}
-            features.append({"type": "Feature", "properties": props, "geometry": geom})
-        return {"type": "FeatureCollection", "features": features}
-    except Exception:
-        return None
+    """Return station dicts (id, name, staname, lat, lon) from the 'coordinates' sheet; without that sheet, every data column with null coords."""
+    data = load_discharge()
+    return data.stations if data is not None else []
 
 
-def _shape_to_geojson_geom(shape):
-    """Convert pyshp shape to GeoJSON geometry dict."""
-    if shape.shapeType not in (3, 5):  # POLYLINE, POLYGON
-        if shape.shapeType == 1:  # POINT
-            return {"type": "Point", "coordinates": shape.points[0]}
+def load_discharge_index():
+    """Station lookup index (padded/unpadded/raw ID -> coordinates + series), or None if no discharge data."""
+    data = load_discharge()
+    if data is None or not data.store.station_ids:
         return None
-    parts = list(shape.parts) + [len(shape.points)]
-    rings = [shape.points[parts[i] : parts[i + 1]] for i in range(len(parts) - 1)]
-    if shape.shapeType == 5:  # POLYGON
-        return {"type": "Polygon", "coordinates": rings}
-    return {"type": "MultiLineString", "coordinates": rings}
+    return data.index
+
+
+def _load_dem_pyramid():
+    return DemPyramid.load(DEM_PYRAMID_DIR)
+
+
+# Reopened when the pyramid is rebuilt (meta.json is written last)
+_dem_pyramid_cache = FileSnapshotCache([DEM_PYRAMID_DIR / "meta.json"], _load_dem_pyramid)
+
+
+def load_dem_pyramid():
+    """Return the DemPyramid, or None if it has not been built."""
+    return _dem_pyramid_cache.get()
+
+
+def _load_watershed():
+    return WatershedLayer.from_shapefile(WATERSHED_SHP)
+
+
+# Parsed once; reloaded when the .shp or .dbf changes
+_watershed_cache = FileSnapshotCache(
+    [WATERSHED_SHP, WATERSHED_SHP.with_suffix(".dbf")], _load_watershed
+)
+
+
+def load_watershed():
+    """Return the cached WatershedLayer, or None if the shapefile is missing or pyshp is not installed."""
+    return _watershed_cache.get()
+
+
+def _load_grid_set():
+    return GridSet.from_csv(DATA_DIR / "grids_domain.csv")
+
+
+# Grid list + nearest-point index, reloaded only when grids_domain.csv changes
+_grid_cache = FileSnapshotCache([DATA_DIR / "grids_domain.csv"], _load_grid_set)
+
+
+def load_grid_set() -> GridSet:
+    """Return the cached GridSet for grids_domain.csv (empty if the file is missing)."""
+    return _grid_cache.get()
 
 
 def load_grids():
-    """Load grid list from grids_domain.csv."""
-    path = DATA_DIR / "grids_domain.csv"
-    if not path.exists():
-        return []
-    rows = []
-    with open(path) as f:
-        r = csv.DictReader(f)
-        for row in r:
-            rows.append({
-                "id": row["ID"],
-                "name": row["NAME"].strip(),
-                "lat": float(row["LAT"]),
-                "lon": float(row["LONG"]),
-                "elev": float(row["ELEVATION"]),
-            })
-    return rows
-
-
-def parse_pcp(path: Path) -> list[dict]:
-    """Parse CHIRPS pcp file: first line YYYYMMDD, then one value per line. Returns [{date, value}]."""
-    if not path.exists():
-        return []
-    with open(path) as f:
-        lines = f.readlines()
-    if not lines:
-        return []
-    start = lines[0].strip()
-    if len(start) != 8:
-        return []
-    from datetime import datetime, timedelta
-    try:
-        base = datetime(int(start[:4]), int(start[4:6]), int(start[6:8]))
-    except ValueError:
-        return []
-    out = []
-    for i, line in enumerate(lines[1:], start=1):
-        try:
-            v = float(line.strip())
-        except ValueError:
-            v = None
-        d = base + timedelta(days=i - 1)
-        out.append({"date": d.strftime("%Y-%m-%d"), "value": v})
-    return out
-
-
-def parse_tmp(path: Path) -> list[dict]:
-    """Parse CHIRTS tmp file: first line YYYYMMDD, then 'tmax,tmin' per line. Returns [{date, tmax, tmin}]."""
-    if not path.exists():
-        return []
-    with open(path) as f:
-        lines = f.readlines()
-    if not lines:
-        return []
-    start = lines[0].strip()
-    if len(start) != 8:
-        return []
-    from datetime import datetime, timedelta
+    """Load grid list from grids_domain.csv (cached)."""
+    return load_grid_set().grids
+
+
+def load_series(variable: str, base: str):
+    """ClimateSeries for one grid file from the binary store (converted on first access); None if missing."""
+    return open_series(DATA_DIR, variable, base, CLIMATE_STORE_DIR)
+
+
+def _point_version(request):
+    """Version of /api/point/{point_id}: grid list + that grid's pcp/tmp/slr source files."""
+    if _grid_cache.version is None:
+        return None
+    grid_info = load_grid_set().find(unquote(request.url.path.rsplit("/", 1)[-1]))
+    if grid_info is None:
+        return None
+    base = grid_info["name"].replace(".txt", "").replace(".slr", "")
+    return _grid_cache.version, file_key([source_path(DATA_DIR, v, base) for v in VARIABLES])
+
+
+def _dem_version():
+    """Version of /api/dem/bounds and /api/dem/image: the raster files inside DEM_DIR, not the folder itself."""
     try:
-        base = datetime(int(start[:4]), int(start[4:6]), int(start[6:8]))
-    except ValueError:
-        return []
-    out = []
-    for i, line in enumerate(lines[1:], start=1):
-        parts = line.strip().split(",")
-        tmax = float(parts[0]) if len(parts) >= 1 and parts[0] else None
-        tmin = float(parts[1]) if len(parts) >= 2 and parts[1] else None
-        d = base + timedelta(days=i - 1)
-        out.append({"date": d.strftime("%Y-%m-%d"), "tmax": tmax, "tmin": tmin})
-    return out
-
-
-def parse_slr(path: Path) -> list[dict]:
-    """Parse SWAT+ .slr: line 4+ are year, jday, value. Returns [{date, value}]."""
-    if not path.exists():
-        return []
-    with open(path) as f:
-        lines = f.readlines()
-    if len(lines) < 4:
-        return []
-    from datetime import datetime
-    out = []
-    for line in lines[3:]:
-        parts = line.strip().split()
-        if len(parts) < 3:
-            continue
-        try:
-            y, j, v = int(parts[0]), int(parts[1]), float(parts[2])
-            d = datetime(y, 1, 1)
-            from datetime import timedelta
-            d = d + timedelta(days=j - 1)
-            out.append({"date": d.strftime("%Y-%m-%d"), "value": v if v != -99 else None})
-        except (ValueError, IndexError):
-            continue
-    return out
+        files = sorted(p for p in DEM_DIR.iterdir() if p.is_file())
+    except OSError:
+        files = []
+    return file_key(files)
 
 
 @app.get("/")
@@ -360,12 +216,15 @@ def root():
         "endpoints": [
             "/api/grids",
             "/api/point/{point_id}",
+            "/api/points",
             "/api/search",
             "/api/discharge/stations",
             "/api/discharge/station/{station_id}",
             "/api/watershed",
             "/api/dem/bounds",
             "/api/dem/image",
+            "/api/dem/tiles.json",
+            "/api/dem/tiles/{z}/{x}/{y}.png",
             "/api/info",
         ],
     }
@@ -387,6 +246,8 @@ def api_info():
         "watershed_exists": WATERSHED_SHP.exists(),
         "dem_dir": str(DEM_DIR),
         "dem_dir_exists": DEM_DIR.is_dir(),
+        "dem_pyramid_dir": str(DEM_PYRAMID_DIR),
+        "dem_pyramid_exists": load_dem_pyramid() is not None,
         "pyshp_available": _pyshp_available(),
         "rasterio_available": _rasterio_available(),
     }
@@ -432,66 +293,139 @@ def get_point_data(
     pcp: bool = Query(True, description="Include precipitation"),
     tmp: bool = Query(True, description="Include temperature"),
     slr: bool = Query(True, description="Include solar radiation"),
-    limit: Optional[int] = Query(365 * 2, description="Max number of days to return (default 2 years)"),
+    limit: Optional[int] = Query(365 * 2, ge=0, description="Max number of days to return (default 2 years)"),
+    start: Optional[str] = Query(None, description="First date (YYYY-MM-DD, inclusive)"),
+    end: Optional[str] = Query(None, description="Last date (YYYY-MM-DD, inclusive)"),
+    fmt: str = Query("records", alias="format", description="records ([{date, ...}]), columns ({dates, values}) or base64 (float32)"),
 ):
     """Return time series for one grid point. point_id is the NAME without 'NA_' or the ID (e.g. 425405 or NA_425405)."""
-    grids = {g["id"]: g for g in load_grids()}
-    name = None
-    if point_id in grids:
-        name = grids[point_id]["name"]
-    else:
-        pid = point_id.replace("NA_", "").strip()
-        for g in grids.values():
-            if g["id"] == pid or g["name"] == point_id or g["name"] == f"NA_{pid}":
-                name = g["name"]
-                break
-    if not name:
+    grid_info = load_grid_set().find(point_id)
+    if grid_info is None:
         raise HTTPException(status_code=404, detail="Point not found")
+    try:
+        check_format(fmt)
+        lo = iso_to_ordinal(start) if start else None
+        hi = iso_to_ordinal(end) if end else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    name = grid_info["name"]
     base = name.replace(".txt", "").replace(".slr", "")
-    grid_info = next((g for g in load_grids() if g["name"] == name), None)
     out = {"id": point_id, "name": name, "grid": grid_info}
 
-    if pcp:
-        pcp_path = DATA_DIR / "pcp" / f"{base}.txt"
-        series = parse_pcp(pcp_path)[-limit:] if limit else parse_pcp(pcp_path)
-        out["pcp"] = series
-
-    if tmp:
-        tmp_path = DATA_DIR / "tmp" / f"{base}.txt"
-        series = parse_tmp(tmp_path)[-limit:] if limit else parse_tmp(tmp_path)
-        out["tmp"] = series
-
-    if slr:
-        slr_path = DATA_DIR / "slr" / f"{base}.slr"
-        if slr_path.exists():
-            series = parse_slr(slr_path)[-limit:] if limit else parse_slr(slr_path)
-            out["slr"] = series
-        else:
-            out["slr"] = []
+    for variable, wanted in (("pcp", pcp), ("tmp", tmp), ("slr", slr)):
+        if wanted:
+            series = load_series(variable, base)
+            if fmt == "records":
+                out[variable] = series.records(lo, hi, limit) if series is not None else []
+            else:
+                out[variable] = (series if series is not None else ClimateSeries.empty(variable)).encode(lo, hi, limit, fmt)
+
+    return FastJSONResponse(out)
+
+
+MAX_BATCH_POINTS = 2000
+
+
+class PointsRequest(BaseModel):
+    """Body of POST /api/points: select grids by ids, bbox or polygon (first one given wins)."""
 
-    return out
+    ids: Optional[list[str]] = None
+    bbox: Optional[list[float]] = None  # [min_lon, min_lat, max_lon, max_lat]
+    polygon: Optional[list[list[float]]] = None  # ring of [lon, lat]
+    variables: list[str] = ["pcp", "tmp", "slr"]
+    start: Optional[str] = None
+    end: Optional[str] = None
+    limit: Optional[int] = Field(365 * 2, ge=0)
+
+
+@app.post("/api/points")
+def get_points_data(req: PointsRequest):
+    """
+    Time series for many grid points at once, columnar: one shared date axis plus, per
+    column (pcp, tmax, tmin, slr), a points x dates value matrix (null = no data).
+    """
+    unknown = [v for v in req.variables if v not in VARIABLES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown variables {unknown}, expected any of {list(VARIABLES)}")
+    try:
+        lo = iso_to_ordinal(req.start) if req.start else None
+        hi = iso_to_ordinal(req.end) if req.end else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    grid_set = load_grid_set()
+    missing = []
+    if req.ids is not None:
+        grids = []
+        for point_id in req.ids:
+            g = grid_set.find(point_id)
+            if g is None:
+                missing.append(point_id)
+            else:
+                grids.append(g)
+    elif req.bbox is not None:
+        if len(req.bbox) != 4:
+            raise HTTPException(status_code=400, detail="bbox must be [min_lon, min_lat, max_lon, max_lat]")
+        grids = grid_set.in_bbox(*req.bbox)
+    elif req.polygon is not None:
+        if len(req.polygon) < 3 or any(len(p) != 2 for p in req.polygon):
+            raise HTTPException(status_code=400, detail="polygon must be a ring of at least 3 [lon, lat] pairs")
+        grids = grid_set.in_polygon(req.polygon)
+    else:
+        raise HTTPException(status_code=400, detail="Give one of ids, bbox or polygon")
+    if len(grids) > MAX_BATCH_POINTS:
+        raise HTTPException(status_code=400, detail=f"{len(grids)} points selected, at most {MAX_BATCH_POINTS} per request")
+
+    bases = [g["name"].replace(".txt", "").replace(".slr", "") for g in grids]
+    series = {v: [load_series(v, b) for b in bases] for v in req.variables}
+    window = common_window([s for lst in series.values() for s in lst], lo, hi, req.limit)
+    first, n = (window[0], window[1] - window[0] + 1) if window else (0, 0)
+
+    values = {}
+    for v, lst in series.items():
+        cube = stack(lst, v, first, first + n - 1)
+        for j, col in enumerate(VARIABLES[v][2]):
+            flat = values_to_json(cube[:, :, j].ravel())
+            values[v if col == "value" else col] = [flat[i * n:(i + 1) * n] for i in range(len(grids))]
+
+    return FastJSONResponse({
+        "points": [{"id": g["id"], "name": g["name"], "lat": g["lat"], "lon": g["lon"]} for g in grids],
+        "missing": missing,
+        "dates": ordinal_range_iso(first, n),
+        "values": values,
+    })
 
 
 @app.get("/api/search")
 def search(
     lat: float = Query(..., description="Latitude"),
     lon: float = Query(..., description="Longitude"),
+    k: int = Query(1, ge=1, le=100, description="Number of nearest grid points to return"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Only return grid points within this great-circle distance (km)"),
 ):
-    """Find the nearest grid point to the given coordinates."""
-    grids = load_grids()
-    if not grids:
+    """Find the nearest grid point(s) to the given coordinates (great-circle distance)."""
+    grid_set = load_grid_set()
+    if not len(grid_set):
         raise HTTPException(status_code=404, detail="No grids loaded")
-    best = min(grids, key=lambda g: (g["lat"] - lat) ** 2 + (g["lon"] - lon) ** 2)
+    matches = grid_set.nearest(lat, lon, k=k, radius_km=radius_km)
+    if not matches:
+        raise HTTPException(status_code=404, detail=f"No grid point within {radius_km} km")
+    neighbors = [
+        {
+            "id": g["id"],
+            "name": g["name"],
+            "lat": g["lat"],
+            "lon": g["lon"],
+            "elev": g["elev"],
+            "distance_km": round(d, 3),
+        }
+        for g, d in matches
+    ]
     return {
         "lat": lat,
         "lon": lon,
-        "nearest": {
-            "id": best["id"],
-            "name": best["name"],
-            "lat": best["lat"],
-            "lon": best["lon"],
-            "elev": best["elev"],
-        },
+        "nearest": neighbors[0],
+        "neighbors": neighbors,
     }
 
 
@@ -527,42 +461,47 @@ def get_discharge_stations():
 @app.get("/api/discharge/station/{station_id}")
 def get_discharge_station(
     station_id: str,
-    limit: Optional[int] = Query(365 * 2, description="Max number of points to return"),
+    limit: Optional[int] = Query(365 * 2, ge=0, description="Max number of points to return (last N)"),
+    start: Optional[str] = Query(None, description="First date YYYY-MM-DD (inclusive)"),
+    end: Optional[str] = Query(None, description="Last date YYYY-MM-DD (inclusive)"),
+    step: Optional[str] = Query(None, description="Aggregate into daily, weekly or monthly bins"),
+    agg: str = Query("mean", description="Bin reduction when step is set: mean, min or max"),
+    fmt: str = Query("records", alias="format", description="records ([{date, value}]), columns ({dates, values}) or base64 (float32)"),
 ):
-    """Return discharge time series for one station. station_id must match STAID or first-row name in data sheet."""
-    _, series = load_discharge_data()
-    if series is None:
+    """Return discharge time series for one station. station_id must match STAID or first-row name in data sheet.
+    start/end clip to a date window; step/agg aggregate it; limit then keeps the last N points."""
+    index = load_discharge_index()
+    if index is None:
         raise HTTPException(status_code=404, detail="Discharge data not loaded")
-    sid_norm = _norm_station_id(station_id)
-    if sid_norm not in series:
-        for k in series:
-            if _norm_station_id(k) == sid_norm or k == station_id:
-                sid_norm = k
-                break
-        else:
-            raise HTTPException(status_code=404, detail=f"Station '{station_id}' not found")
-    data = series[sid_norm]
-    if limit and len(data) > limit:
-        data = data[-limit:]
-    stations = load_discharge_coordinates()
-    display_name = next((s["name"] for s in stations if _norm_station_id(s["id"]) == sid_norm), sid_norm)
-    return {"id": sid_norm, "name": display_name, "discharge": data}
+    station = index.get(station_id)
+    if station is None or station.series is None:
+        raise HTTPException(status_code=404, detail=f"Station '{station_id}' not found")
+    try:
+        data = station.series.query(start=start, end=end, step=step, agg=agg, limit=limit, fmt=fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"id": station.series.station_id, "name": station.name, "discharge": data})
 
 
 # ----- Watershed & DEM (maps folder) -----
 
 
 @app.get("/api/watershed")
-def get_watershed():
+def get_watershed(
+    zoom: Optional[int] = Query(None, ge=0, le=MAX_ZOOM, description="Simplify to one screen pixel at this map zoom"),
+    tolerance: Optional[float] = Query(None, ge=0, description="Douglas-Peucker tolerance in degrees, snapped to the nearest zoom level (overrides zoom)"),
+):
     """Return watershed polygons as GeoJSON (from maps/watershed_WBDHU8.shp). Returns empty FeatureCollection if not found."""
-    geojson = load_watershed_geojson()
-    if geojson is None:
+    layer = load_watershed()
+    if layer is None:
         return {
             "type": "FeatureCollection",
             "features": [],
             "message": f"Watershed not found. Looked at: {WATERSHED_SHP}. Set SWAT_VIEWER_DIR if needed.",
         }
-    return geojson
+    if tolerance is None and zoom is not None:
+        tolerance = tolerance_for_zoom(zoom)
+    return Response(content=layer.geojson_bytes(tolerance), media_type="application/json")
 
 
 @app.get("/api/dem/bounds")
@@ -589,6 +528,41 @@ def get_dem_image():
     return Response(content=result, media_type="image/png")
 
 
+@app.get("/api/dem/tiles.json")
+def get_dem_tiles_info():
+    """Zoom range, WGS84 bounds [west, south, east, north] and colormaps of the DEM tile pyramid."""
+    pyramid = load_dem_pyramid()
+    if pyramid is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"DEM tiles not built. Run scripts/build_dem_tiles.py (looked at: {DEM_PYRAMID_DIR}).",
+        )
+    return pyramid.tilejson()
+
+
+@app.get("/api/dem/tiles/{z}/{x}/{y}.png", response_class=Response)
+def get_dem_tile(
+    z: int,
+    x: int,
+    y: int,
+    colormap: str = Query("gray", description=f"One of: {', '.join(COLORMAPS)}"),
+    hillshade: bool = Query(False, description="Shade relief (sun from the northwest)"),
+):
+    """Return one 256x256 XYZ DEM tile (PNG, transparent outside the DEM)."""
+    if colormap not in COLORMAPS:
+        raise HTTPException(status_code=400, detail=f"Invalid colormap '{colormap}', expected one of {', '.join(COLORMAPS)}")
+    pyramid = load_dem_pyramid()
+    if pyramid is None:
+        raise HTTPException(status_code=404, detail=f"DEM tiles not built. Looked at: {DEM_PYRAMID_DIR}.")
+    if not pyramid.contains(z, x, y):
+        raise HTTPException(status_code=404, detail="Tile outside the DEM")
+    return Response(
+        content=pyramid.render(z, x, y, colormap, hillshade),
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+
 def _get_dem_bounds():
     """Read DEM extent with rasterio; return [south, north, west, east] in WGS84."""
     try:
@@ -0,0 +1,120 @@
+"""
+Benchmark export_water_level_data.py's vectorized pipeline against the old per-row code
+(parse_dt via .apply + iterrows) on a synthetic NOAA 6-minute water level CSV.
+
+Both are run on the same files; verified / preliminary / predictions must come out
+identical. (Residuals are not compared: the old code joined observations on the
+prediction *date*, the new one on the timestamp.)
+
+Run: python scripts/benchmark_export_water_level.py [--years 15] [--skip-legacy]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPT_DIR))
+from export_water_level_data import _find_col, station_series  # noqa: E402
+
+
+def write_synthetic(folder: Path, years: float, seed: int = 0):
+    """NOAA-style {sta}_water_level.csv / {sta}_predictions.csv at 6-minute interval."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n = int(years * 365.25 * 24 * 10)
+    t = pd.date_range("2010-01-01", periods=n, freq="6min")
+    tide = 0.6 * np.sin(2 * np.pi * np.arange(n) / 124.2)  # ~12.42 h M2 tide
+    stamps = t.strftime("%Y-%m-%d %H:%M")
+    wl = pd.DataFrame({
+        "Date Time": stamps,
+        " Water Level": np.round(tide + rng.normal(0, 0.05, n), 3),
+        " Sigma": 0.003,
+        " O or I (for verified)": 0,
+        " F": 0,
+        " R": 0,
+        " L": 0,
+        " Quality": np.where(np.arange(n) > n * 0.95, "p", "v"),
+    })
+    wl.loc[rng.choice(n, n // 1000, replace=False), " Water Level"] = np.nan
+    wl_path = folder / "9999999_water_level.csv"
+    pred_path = folder / "9999999_predictions.csv"
+    wl.to_csv(wl_path, index=False)
+    pd.DataFrame({"Date Time": stamps, " Prediction": np.round(tide, 3)}).to_csv(pred_path, index=False)
+    return wl_path, pred_path, n
+
+
+def legacy_series(wl_path, pred_path):
+    """The pre-vectorization code path (per-row strptime + iterrows) for verified/preliminary/predictions."""
+    import pandas as pd
+
+    def parse_dt(s):
+        s = str(s).strip()
+        for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(s[:19], fmt)
+            except ValueError:
+                continue
+        return None
+
+    df = pd.read_csv(wl_path)
+    time_col = _find_col(df, ["Date Time", "DateTime", "date time"]) or df.columns[0]
+    value_col = _find_col(df, ["Water Level", " water level"]) or df.columns[1]
+    quality_col = _find_col(df, ["Quality", " quality"])
+    df["dt"] = df[time_col].apply(parse_dt)
+    df["value"] = pd.to_numeric(df[value_col], errors="coerce")
+    df["quality"] = df[quality_col].astype(str).str.strip().str.lower() if quality_col else "v"
+    df = df.dropna(subset=["dt", "value"])
+    verified, preliminary = [], []
+    for _, r in df.iterrows():
+        d = r["dt"].strftime("%Y-%m-%d")
+        v = float(r["value"])
+        if (r["quality"] if quality_col else "v").strip().lower() == "p":
+            preliminary.append({"date": d, "value": v})
+        else:
+            verified.append({"date": d, "value": v})
+    predictions = []
+    pdf = pd.read_csv(pred_path)
+    tcol = _find_col(pdf, ["Date Time", "DateTime"]) or pdf.columns[0]
+    pdf["dt"] = pdf[tcol].apply(parse_dt)
+    pdf["value"] = pd.to_numeric(pdf[pdf.columns[1]], errors="coerce")
+    pdf = pdf.dropna(subset=["dt", "value"])
+    for _, r in pdf.iterrows():
+        predictions.append({"date": r["dt"].strftime("%Y-%m-%d"), "value": float(r["value"])})
+    return {"verified": verified, "preliminary": preliminary, "predictions": predictions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the water level export on synthetic 6-minute data")
+    parser.add_argument("--years", type=float, default=2, help="Years of 6-minute data (15 years = ~1.3M rows)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the vectorized pipeline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wl_path, pred_path, n = write_synthetic(Path(tmp), args.years)
+        print(f"Synthetic station: {n:,} rows of 6-minute water level + predictions ({args.years:g} years)")
+
+        t0 = time.perf_counter()
+        new = station_series(wl_path, pred_path)
+        t_new = time.perf_counter() - t0
+        print(f"vectorized: {t_new:8.2f} s  ({len(new['residual']):,} residuals)")
+
+        if args.skip_legacy:
+            return
+        t0 = time.perf_counter()
+        old = legacy_series(wl_path, pred_path)
+        t_old = time.perf_counter() - t0
+        print(f"per-row:    {t_old:8.2f} s")
+        for key in ("verified", "preliminary", "predictions"):
+            if old[key] != new[key]:
+                print(f"MISMATCH in {key}", file=sys.stderr)
+                sys.exit(1)
+        print(f"Outputs identical; speedup {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
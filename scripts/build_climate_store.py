@@ -0,0 +1,44 @@
+"""
+Convert the CHIRPS pcp/tmp and SWAT+ .slr text files of a climate domain into the binary
+store used by the API (see backend/climate_store.py). Files that are already converted
+and unchanged are skipped; the API also converts missing files lazily on first access.
+
+Usage:
+  python scripts/build_climate_store.py <domain_dir>
+  python scripts/build_climate_store.py <domain_dir> --vars pcp tmp --force
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from climate_store import STORE_DIR_NAME, VARIABLES, build_store  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the binary pcp/tmp/slr store for a climate domain")
+    parser.add_argument(
+        "data_dir",
+        nargs="?",
+        default=os.environ.get("SWAT_DATA_DIR"),
+        help="Domain folder with pcp/, tmp/, slr/ (default: $SWAT_DATA_DIR)",
+    )
+    parser.add_argument(
+        "--store-dir",
+        default=os.environ.get("SWAT_CLIMATE_STORE_DIR"),
+        help=f"Output folder (default: $SWAT_CLIMATE_STORE_DIR or <data_dir>/{STORE_DIR_NAME})",
+    )
+    parser.add_argument("--vars", nargs="+", choices=list(VARIABLES), help="Variables to convert (default: all)")
+    parser.add_argument("--force", action="store_true", help="Reconvert files that are already up to date")
+    args = parser.parse_args()
+
+    if not args.data_dir or not Path(args.data_dir).is_dir():
+        parser.error("data_dir not found (pass it or set SWAT_DATA_DIR)")
+    build_store(Path(args.data_dir), args.store_dir, args.vars, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Build the DEM tile pyramid served by /api/dem/tiles/{z}/{x}/{y}.png (see backend/dem_tiles.py).
+Run once after maps/dem changes; needs rasterio.
+
+Usage:
+  python scripts/build_dem_tiles.py
+  python scripts/build_dem_tiles.py --dem maps/dem --out maps/dem_pyramid --min-zoom 6 --max-zoom 12
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from dem_tiles import build_pyramid, default_max_zoom  # noqa: E402
+
+MAPS_DIR = Path(os.environ.get("SWAT_VIEWER_DIR", str(PROJECT_ROOT))) / "maps"
+# Largest default zoom: z12 is ~38 m/px at the equator (~28 m at 42N)
+MAX_DEFAULT_ZOOM = 12
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Web Mercator DEM tile pyramid")
+    parser.add_argument("--dem", default=str(MAPS_DIR / "dem"), help="DEM raster (file or ESRI grid folder)")
+    parser.add_argument(
+        "--out",
+        default=os.environ.get("SWAT_DEM_PYRAMID_DIR", str(MAPS_DIR / "dem_pyramid")),
+        help="Output folder (default: $SWAT_DEM_PYRAMID_DIR or maps/dem_pyramid)",
+    )
+    parser.add_argument("--min-zoom", type=int, default=6, help="Lowest zoom level to build (default 6)")
+    parser.add_argument(
+        "--max-zoom",
+        type=int,
+        default=None,
+        help=f"Highest zoom level (default: DEM native resolution, at most {MAX_DEFAULT_ZOOM}); higher zooms are upsampled",
+    )
+    args = parser.parse_args()
+
+    dem = Path(args.dem)
+    if not dem.exists():
+        parser.error(f"DEM not found: {dem}")
+    max_zoom = args.max_zoom if args.max_zoom is not None else min(default_max_zoom(dem), MAX_DEFAULT_ZOOM)
+    min_zoom = min(args.min_zoom, max_zoom)
+    print(f"Building DEM pyramid z{min_zoom}-z{max_zoom} from {dem} -> {args.out}")
+    meta = build_pyramid(dem, Path(args.out), min_zoom, max_zoom)
+    print(f"Done. Elevation range {meta['vmin']:.1f} - {meta['vmax']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
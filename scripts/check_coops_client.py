@@ -0,0 +1,141 @@
+"""
+End-to-end check of coops_client.py against coops_stub_server.py on a small synthetic
+recording (no network needed; needs httpx).
+
+- order: 8 one-month windows fetched by 8 workers, answered out of order (--jitter),
+  must come out as the recorded CSV byte for byte; the empty month ("No data" answer)
+  leaves a gap without failing the download.
+- retries: every request fails twice with HTTP 503 (--fail-first 2) and is retried until
+  the same CSV is written; the stub must have seen exactly 2 x windows 503s.
+- no data: a product with nothing recorded is reported as "no data" and writes no file;
+  predictions missing at interval=6 fall back to interval=hilo.
+
+Run from project root: python scripts/check_coops_client.py (exit code 1 on failure)
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPT_DIR))
+from coops_client import ProductSpec, plan, plan_windows, run_downloads, window_months  # noqa: E402
+from coops_stub_server import serve  # noqa: E402
+
+STATION = "9999999"
+BEGIN, END = "20230701", "20240229"
+EMPTY_MONTH = (2024, 1)
+WATER_LEVEL_HEADER = "Date Time, Water Level, Sigma, O or I (for verified), F, R, L, Quality"
+HILO_HEADER = "Date Time, Prediction, Type"
+
+
+def write_recordings(folder: Path) -> dict:
+    """Hourly water_level (minus EMPTY_MONTH) and hilo predictions; returns {name: text}."""
+    rows = []
+    t, end = datetime(2023, 7, 1), datetime(2024, 2, 29, 23)
+    while t <= end:
+        if (t.year, t.month) != EMPTY_MONTH:
+            rows.append(f"{t:%Y-%m-%d %H:%M},{(t.hour % 12) / 10:.3f},0.003,0,0,0,0,v")
+        t += timedelta(hours=1)
+    hilo = []
+    t = datetime(2023, 7, 1, 3, 12)
+    while t <= end:
+        hilo.append(f"{t:%Y-%m-%d %H:%M},{1.2 if len(hilo) % 2 == 0 else -0.1},{'H' if len(hilo) % 2 == 0 else 'L'}")
+        t += timedelta(hours=12, minutes=25)
+    texts = {
+        f"{STATION}_water_level.csv": "\n".join([WATER_LEVEL_HEADER] + rows) + "\n",
+        f"{STATION}_predictions_daily.csv": "\n".join([HILO_HEADER] + hilo) + "\n",
+    }
+    for name, text in texts.items():
+        (folder / name).write_text(text, encoding="utf-8", newline="")
+    return texts
+
+
+def _url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/api/prod/datagetter"
+
+
+def _read(path) -> str:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def check_order(rec: Path, out: Path, texts: dict) -> list:
+    server = serve(str(rec), jitter=0.05)
+    try:
+        downloads = plan([STATION], [ProductSpec("water_level")], BEGIN, END, str(out))
+        (result,) = run_downloads(downloads, workers=8, rate=0, base_url=_url(server), log=False)
+    finally:
+        server.shutdown()
+    errors = []
+    if result.status != "ok":
+        errors.append(f"status {result.status!r}, expected 'ok'")
+    elif _read(downloads[0].path) != texts[f"{STATION}_water_level.csv"]:
+        errors.append("written CSV differs from the recording (window order / gap)")
+    if os.path.exists(out / ".coops_cache"):
+        errors.append("checkpoint folder left behind after a complete download")
+    return errors
+
+
+def check_retries(rec: Path, out: Path, texts: dict) -> list:
+    server = serve(str(rec), fail_first=2)
+    try:
+        downloads = plan([STATION], [ProductSpec("water_level")], BEGIN, END, str(out))
+        (result,) = run_downloads(downloads, workers=8, rate=0, base_url=_url(server), cache_dir=False, log=False)
+    finally:
+        server.shutdown()
+    d = downloads[0]
+    windows = len(plan_windows(d.begin, d.end, window_months(d.product, d.params)))
+    errors = []
+    if result.status != "ok":
+        errors.append(f"status {result.status!r}, expected 'ok'")
+    elif _read(d.path) != texts[f"{STATION}_water_level.csv"]:
+        errors.append("written CSV differs from the recording")
+    if server.stats.get(503) != 2 * windows or server.stats.get(200) != windows:
+        errors.append(f"stub answered {server.stats}, expected {{503: {2 * windows}, 200: {windows}}}")
+    return errors
+
+
+def check_no_data(rec: Path, out: Path, texts: dict) -> list:
+    specs = [
+        ProductSpec("air_temperature"),
+        ProductSpec("predictions", {"interval": "6"}, [{"interval": "hilo"}]),
+    ]
+    server = serve(str(rec))
+    try:
+        downloads = plan([STATION], specs, BEGIN, END, str(out))
+        air, pred = run_downloads(downloads, workers=4, rate=0, base_url=_url(server), cache_dir=False, log=False)
+    finally:
+        server.shutdown()
+    errors = []
+    if air.status != "no data" or os.path.exists(downloads[0].path):
+        errors.append(f"air_temperature: status {air.status!r} (expected 'no data', no file)")
+    if pred.status != "ok" or (pred.params or {}).get("interval") != "hilo":
+        errors.append(f"predictions: status {pred.status!r}, params {pred.params} (expected the hilo fallback)")
+    elif _read(downloads[1].path) != texts[f"{STATION}_predictions_daily.csv"]:
+        errors.append("predictions: written CSV differs from the hilo recording")
+    return errors
+
+
+CHECKS = [("order", check_order), ("retries", check_retries), ("no data", check_no_data)]
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        rec = Path(tmp) / "recordings"
+        rec.mkdir()
+        texts = write_recordings(rec)
+        for name, check in CHECKS:
+            out = Path(tmp) / name.replace(" ", "_")
+            errors = check(rec, out, texts)
+            print(f"{name}: {'ok' if not errors else 'FAILED'}")
+            for e in errors:
+                print(f"  {e}")
+            failed += bool(errors)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
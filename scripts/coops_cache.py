@@ -0,0 +1,148 @@
+"""
+Per-window checkpoints for coops_client downloads, so an interrupted or partly failed
+download resumes where it stopped.
+
+Every response is put on disk as soon as it arrives, under
+<output dir>/.coops_cache/<station>_<product>_<params hash>/ (the hash covers datum,
+interval, ..., so a fallback parameter set gets its own folder):
+- <begin>_<end>.csv: the raw CSV of a window that returned data;
+- chunks.jsonl: an append-only journal with one line per answered window,
+  {"chunk", "status" (data | empty | failed), "bytes", "sha256", "fetched"}; the last line
+  for a window wins and a torn last line (crash mid-write) is ignored.
+
+A re-run reuses every window journaled as empty, or as data whose file still has the
+recorded size and SHA-256, and fetches only missing, failed or damaged ones. A window that
+had not settled when it was fetched (fetched within SETTLE_DAYS of its last day) is
+fetched again, since the API was still adding data to it. The folder is removed once the
+download's CSV is written (or the download turns out to have no data); a failed download
+keeps it for the next run.
+
+ChunkCache(None) keeps the responses in memory instead (--no-cache).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+CACHE_DIR_NAME = ".coops_cache"
+JOURNAL = "chunks.jsonl"
+SETTLE_DAYS = 1
+
+
+def cache_folder(root: str, station: str, product: str, params: dict) -> str:
+    key = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+    return os.path.join(root, f"{station}_{product}_{key}")
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ChunkCache:
+    """Window responses of one download / parameter set (see module docstring)."""
+
+    __slots__ = ("folder", "entries", "_texts")
+
+    def __init__(self, folder: str = None):
+        self.folder = folder
+        self.entries = {}
+        self._texts = {}
+        if folder:
+            self._read_journal()
+
+    def _read_journal(self):
+        try:
+            f = open(os.path.join(self.folder, JOURNAL), "r", encoding="utf-8")
+        except OSError:
+            return
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and "chunk" in entry:
+                    self.entries[entry["chunk"]] = entry
+
+    @staticmethod
+    def name(begin: date, end: date) -> str:
+        return f"{begin:%Y%m%d}_{end:%Y%m%d}"
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, f"{name}.csv")
+
+    def status(self, begin: date, end: date):
+        """"data" / "empty" if the window's checkpoint can be reused, else None (fetch it)."""
+        entry = self.entries.get(self.name(begin, end))
+        if not entry or entry.get("status") not in ("data", "empty"):
+            return None
+        try:
+            fetched = date.fromisoformat(entry.get("fetched", ""))
+        except ValueError:
+            return None
+        if fetched <= end + timedelta(days=SETTLE_DAYS):
+            return None
+        if entry["status"] == "data" and self.text(begin, end) is None:
+            return None
+        return entry["status"]
+
+    def put(self, begin: date, end: date, text, status: str) -> str:
+        """Checkpoint one answered window (text None for a failed one); returns status."""
+        name = self.name(begin, end)
+        entry = {
+            "chunk": name,
+            "status": status,
+            "bytes": 0,
+            "sha256": None,
+            "fetched": datetime.now(timezone.utc).date().isoformat(),
+        }
+        if status == "data":
+            data = text.encode("utf-8")
+            entry["bytes"], entry["sha256"] = len(data), _sha256(data)
+            if self.folder:
+                os.makedirs(self.folder, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=self.folder, prefix=f".{name}.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp, self._path(name))
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+                    raise
+            else:
+                self._texts[name] = text
+        if self.folder:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(os.path.join(self.folder, JOURNAL), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        self.entries[name] = entry
+        return status
+
+    def text(self, begin: date, end: date):
+        """Response text of a "data" window; None if missing or damaged."""
+        name = self.name(begin, end)
+        if self.folder is None:
+            return self._texts.get(name)
+        entry = self.entries.get(name) or {}
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != entry.get("bytes") or _sha256(data) != entry.get("sha256"):
+            return None
+        return data.decode("utf-8")
+
+    def release(self, begin: date, end: date):
+        """Forget an in-memory response once it has been written (the disk checkpoint stays)."""
+        self._texts.pop(self.name(begin, end), None)
+
+    def clear(self):
+        """Drop all checkpoints (the download is complete)."""
+        self.entries.clear()
+        self._texts.clear()
+        if self.folder:
+            shutil.rmtree(self.folder, ignore_errors=True)
@@ -0,0 +1,730 @@
+"""
+Async client and job runner for the NOAA CO-OPS Data API (Tides & Currents datagetter),
+shared by the download_noaa_*.py scripts.
+
+A download is one output CSV: one product for one station over [begin, end]. The API caps
+the span of one request per product (6-minute data: 1 month; hourly, high_low and
+6-minute predictions: 1 year; hilo predictions and daily products: 10 years), so each
+download is split into calendar-aligned windows (plan_windows) that are fetched
+concurrently and merged in time order (duplicate timestamps dropped).
+
+All requests of a run go through one CoopsClient:
+- one httpx.AsyncClient, so connections are kept alive and reused;
+- a global limit on requests in flight (--workers), shared by every station and product;
+- a token bucket (--rate requests/s, bursts up to --workers) so the API is not hammered;
+- retries with exponential backoff for timeouts, connection errors, 429 and 5xx.
+A response is data only if it is a CSV starting with a "Date Time" header; CO-OPS error /
+"No data" texts count as an empty window. A window that still fails after the retries
+fails its download, which is then not written. Every response is checkpointed on disk
+as it arrives (coops_cache.py), so re-running fetches only the windows still missing.
+
+--update refreshes existing CSVs in place: the last timestamp is read from the end of the
+file (last_timestamp), only the window from that day to today is requested, and the rows
+after that timestamp are appended (append_csv). Only the primary parameter set is asked
+(a fallback would mix datums / cadences into the file), and rows whose header differs
+from the file's are not appended. Suitable for a nightly cron job.
+
+ProductSpec / plan() turn stations x products into Download jobs. run_downloads() hands
+the (download, window) requests of the whole run to --workers coroutines, so a
+14-station x 6-product x 16-year backfill keeps all request slots busy instead of
+finishing one product before starting the next. Each download is streamed to its CSV in
+window order (CsvSink) through a reorder buffer of at most REORDER_WINDOWS responses, so
+memory stays at a few windows per open download, not the whole history. A spec can list
+fallback parameter sets, tried in order when the primary one returns no data at all
+(e.g. interval=hilo for subordinate tide stations that have no 6-minute predictions).
+
+--base-url (or SWAT_COOPS_BASE_URL) points the scripts at another server, e.g.
+scripts/coops_stub_server.py, which replays local CSVs for offline testing.
+"""
+import asyncio
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from coops_cache import CACHE_DIR_NAME, ChunkCache, cache_folder
+
+API_BASE = os.environ.get("SWAT_COOPS_BASE_URL", "https://api.tidesandcurrents.noaa.gov/api/prod/datagetter")
+APPLICATION = "SWAT_Viewer_Brown"
+USER_AGENT = "SWAT-Viewer/1.0 (Brown University Hydrological Modeling)"
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 10.0
+# Windows of one download handed out ahead of the first one not yet written
+REORDER_WINDOWS = 16
+TIMEOUT = 120.0
+RETRIES = 3
+
+DATUM_PRODUCTS = frozenset({
+    "water_level", "hourly_height", "high_low", "monthly_mean", "one_minute_water_level",
+    "predictions", "ofs_water_level", "daily_mean", "daily_max_min",
+})
+MET_PRODUCTS = ["air_temperature", "water_temperature", "wind", "air_pressure", "humidity", "visibility"]
+
+
+def _httpx():
+    try:
+        import httpx
+    except ImportError:
+        print("Install: pip install httpx", file=sys.stderr)
+        sys.exit(1)
+    return httpx
+
+
+def parse_date(value) -> date:
+    """yyyyMMdd or YYYY-MM-DD (or a date) -> date."""
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()
+    return datetime.strptime(value, "%Y-%m-%d" if "-" in value else "%Y%m%d").date()
+
+
+def today_utc() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def load_station_ids(csv_path) -> list:
+    """Numeric station IDs from the "id" column (else the first) of noaa_stations_in_domain.csv."""
+    ids = []
+    if not os.path.isfile(csv_path):
+        return ids
+    with open(csv_path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        id_col = next((c for c in reader.fieldnames or [] if str(c).strip().lower() == "id"), None)
+        for row in reader:
+            val = row.get(id_col) if id_col else next(iter(row.values()), "")
+            s = str(val or "").strip()
+            if s.isdigit() and s not in ids:
+                ids.append(s)
+    return ids
+
+
+def window_months(product: str, params: dict) -> int:
+    """Longest request span the API accepts for this product/interval, in months."""
+    interval = params.get("interval")
+    if product == "predictions":
+        return 120 if interval == "hilo" else 12
+    if product in ("daily_mean", "daily_max_min", "monthly_mean"):
+        return 120
+    if product in ("high_low", "hourly_height") or interval == "h":
+        return 12
+    return 1
+
+
+def plan_windows(begin: date, end: date, months: int) -> list:
+    """
+    [(first day, last day)] covering begin..end, cut at calendar months (months=1) or at
+    January of every months/12-th year (months=12, 120), so no window exceeds the limit.
+    """
+    base = begin.year * 12 + (0 if months % 12 == 0 else begin.month - 1)
+    windows = []
+    start = begin
+    while start <= end:
+        index = start.year * 12 + start.month - 1
+        boundary = base + ((index - base) // months + 1) * months
+        stop = min(end, date(boundary // 12, boundary % 12 + 1, 1) - timedelta(days=1))
+        windows.append((start, stop))
+        start = stop + timedelta(days=1)
+    return windows
+
+
+def is_data(text) -> bool:
+    """True for a CSV response with a "Date Time" header (not an error / "No data" text)."""
+    return bool(text) and text.lstrip()[:9].lower() in ("date time", "date_time")
+
+
+def parse_csv(text):
+    """Response text -> (header line, [data lines]); (None, []) for errors / no data."""
+    if not is_data(text):
+        return None, []
+    lines = [ln.rstrip("\r") for ln in text.strip().split("\n")]
+    return lines[0], [ln for ln in lines[1:] if ln.strip()]
+
+
+def _timestamp(line: str) -> str:
+    return line.split(",", 1)[0]
+
+
+def last_timestamp(path, block: int = 4096):
+    """
+    Timestamp (first field) of the last data row of a CSV, read backwards from the end of
+    the file in `block`-sized steps (no full parse); None if missing or header-only.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            if len(tail.strip().splitlines()) > 1:  # the last line is complete
+                break
+    lines = tail.strip().splitlines()
+    if not lines:
+        return None
+    ts = _timestamp(lines[-1].decode("utf-8", errors="replace")).strip()
+    return ts if ts[:4].isdigit() else None
+
+
+def read_header(path):
+    """First line of a CSV without its line ending; None if missing or empty."""
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            line = f.readline()
+    except OSError:
+        return None
+    return line.rstrip("\r\n") or None
+
+
+def append_csv(path, lines):
+    """Append lines to an existing CSV in place, using the line ending the file already has."""
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 2))
+        end = f.read(2)
+        newline = b"\r\n" if end == b"\r\n" else b"\n"
+        data = newline.join(ln.encode("utf-8") for ln in lines) + newline
+        if size and not end.endswith(b"\n"):
+            data = newline + data
+        try:
+            f.write(data)
+            f.flush()
+        except BaseException:
+            f.truncate(size)  # never leave half a row behind
+            raise
+
+
+class CsvSink:
+    """
+    Writes a download's rows window by window, in window order: to a temp file next to the
+    CSV that commit() renames over it, or (append=True, --update) straight onto the end of
+    the existing CSV. Windows are disjoint and in time order, so sorting each window and
+    dropping rows at or before the last timestamp written yields the fully sorted,
+    de-duplicated file without holding more than one window. When appending, windows whose
+    header differs from the file's (`header`) are refused (mismatch) instead of written.
+    """
+
+    __slots__ = ("path", "append", "header", "last", "seen", "mismatch", "rows", "_tmp", "_f")
+
+    def __init__(self, path, since: str = None, header: str = None):
+        self.path = path
+        self.append = since is not None
+        self.header = header
+        self.last = since or ""
+        self.seen = False  # any data at all (even rows already on disk)
+        self.mismatch = False
+        self.rows = 0
+        self._tmp = self._f = None
+
+    def write(self, header: str, lines):
+        if self.append and self.header is not None and header.strip() != self.header.strip():
+            self.mismatch = True
+            return
+        self.seen = True
+        out = []
+        for ln in sorted(lines, key=_timestamp):
+            ts = _timestamp(ln)
+            if ts > self.last:
+                out.append(ln)
+                self.last = ts
+        if not out:
+            return
+        if self.append:
+            append_csv(self.path, out)
+        else:
+            if self._f is None:
+                folder = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(folder, exist_ok=True)
+                fd, self._tmp = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp")
+                self._f = os.fdopen(fd, "w", encoding="utf-8", newline="")
+                self._f.write(header + "\n")
+            self._f.write("\n".join(out) + "\n")
+        self.rows += len(out)
+
+    def commit(self):
+        if self._f is not None:
+            self._f.close()
+            os.chmod(self._tmp, 0o644)
+            os.replace(self._tmp, self.path)
+            self._f = None
+
+    def discard(self):
+        """Drop the temp file (rows already appended in append mode stay: they are a contiguous prefix)."""
+        if self._f is not None:
+            self._f.close()
+            os.unlink(self._tmp)
+            self._f = None
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `capacity` banked; acquire() waits for one (rate 0 = no limit)."""
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated", "_lock")
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CoopsClient:
+    """
+    Async CO-OPS datagetter client (use as `async with`). fetch() returns the response text,
+    "" for a definitive non-data answer, or None if the request kept failing.
+    """
+
+    __slots__ = (
+        "base_url", "workers", "retries", "timeout", "requests", "retried", "failed",
+        "_limit", "_bucket", "_client", "_transport", "_httpx", "_warned",
+    )
+
+    def __init__(self, base_url: str = API_BASE, workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE,
+                 retries: int = RETRIES, timeout: float = TIMEOUT, transport=None):
+        self.base_url = base_url
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.timeout = timeout
+        self.requests = self.retried = self.failed = 0
+        self._limit = asyncio.Semaphore(self.workers)
+        self._bucket = TokenBucket(rate, self.workers)
+        self._client = None
+        self._transport = transport
+        self._httpx = _httpx()
+        self._warned = False
+
+    async def __aenter__(self):
+        httpx = self._httpx
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+            transport=self._transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    def query(self, station: str, product: str, begin: date, end: date, params=None) -> dict:
+        q = {
+            "station": station,
+            "product": product,
+            "begin_date": f"{begin:%Y%m%d}",
+            "end_date": f"{end:%Y%m%d}",
+            "time_zone": "gmt",
+            "units": "metric",
+            "format": "csv",
+            "application": APPLICATION,
+        }
+        for key, value in (params or {}).items():
+            if value is None or (key == "datum" and product not in DATUM_PRODUCTS):
+                continue
+            q[key] = value
+        return q
+
+    async def get(self, query: dict):
+        """One GET through the concurrency limit and rate limiter -> (status, text); raises on transport errors."""
+        async with self._limit:
+            await self._bucket.acquire()
+            self.requests += 1
+            r = await self._client.get(self.base_url, params=query)
+            return r.status_code, r.text, r.headers.get("retry-after")
+
+    async def fetch(self, station: str, product: str, begin: date, end: date, params=None):
+        query = self.query(station, product, begin, end, params)
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                status, text, retry_after = await self.get(query)
+            except self._httpx.TransportError:
+                pass
+            else:
+                if status == 200:
+                    return text
+                if status == 403:
+                    if not self._warned:
+                        self._warned = True
+                        print("  [403 Forbidden] NOAA API may block automated requests; try another network.",
+                              file=sys.stderr)
+                    break
+                if status != 429 and status < 500:
+                    return ""
+            if attempt < self.retries:
+                self.retried += 1
+                delay = 2 ** attempt
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                await asyncio.sleep(delay)
+        self.failed += 1
+        return None
+
+
+class ProductSpec:
+    """A product to download for every station: extra API params, fallback params, file name."""
+
+    __slots__ = ("product", "params", "fallbacks", "filename")
+
+    def __init__(self, product: str, params=None, fallbacks=(), filename: str = "{station}_{product}.csv"):
+        self.product = product
+        self.params = dict(params or {})
+        self.fallbacks = [dict(fb) for fb in fallbacks]
+        self.filename = filename
+
+
+class Download:
+    """One output CSV: `product` for `station` over [begin, end]."""
+
+    __slots__ = ("station", "product", "begin", "end", "path", "params", "fallbacks")
+
+    def __init__(self, station, product, begin, end, path, params=None, fallbacks=()):
+        self.station = station
+        self.product = product
+        self.begin = begin
+        self.end = end
+        self.path = path
+        self.params = dict(params or {})
+        self.fallbacks = list(fallbacks)
+
+    def variants(self):
+        """Parameter sets to try in order: the primary one, then each fallback applied on top."""
+        yield self.params
+        for fb in self.fallbacks:
+            yield dict(self.params, **fb)
+
+    def label(self) -> str:
+        return f"{self.station} {self.product}"
+
+    def since(self, timestamp: str):
+        """Copy covering the day of `timestamp` (the last row on disk) through today."""
+        return Download(self.station, self.product, parse_date(timestamp[:10]), today_utc(), self.path,
+                        self.params, self.fallbacks)
+
+
+class DownloadResult:
+    __slots__ = ("download", "status", "rows", "params", "failed_windows", "resumed", "since")
+
+    def __init__(self, download, status, rows=0, params=None, failed_windows=0, resumed=0, since=None):
+        self.download = download
+        self.status = status  # "ok" | "no data" | "up to date" | "skipped" | "failed" | "header differs"
+        self.rows = rows
+        self.params = params
+        self.failed_windows = failed_windows
+        self.resumed = resumed  # windows taken from the checkpoints of an earlier run
+        self.since = since  # --update: last timestamp that was already on disk
+
+    def describe(self) -> str:
+        d = self.download
+        if self.status == "ok":
+            extra = {k: v for k, v in self.params.items() if d.params.get(k) != v}
+            suffix = f" (fallback {', '.join(f'{k}={v}' for k, v in extra.items())})" if extra else ""
+            if self.resumed:
+                suffix += f" ({self.resumed} windows resumed)"
+            if self.since:
+                return f"  {d.label()}: +{self.rows} rows after {self.since} -> {d.path}{suffix}"
+            return f"  {d.label()}: {self.rows} rows -> {d.path}{suffix}"
+        if self.status == "failed":
+            return (f"  {d.label()}: FAILED ({self.failed_windows} requests kept failing; not written, "
+                    f"re-run to fetch just those)")
+        if self.status == "skipped":
+            return f"  {d.label()}: skipped (exists)"
+        if self.status == "header differs":
+            return f"  {d.label()}: NOT updated (the API's columns differ from the header of {d.path})"
+        if self.status == "up to date":
+            return f"  {d.label()}: up to date ({self.since})"
+        return f"  {d.label()}: no data"
+
+
+def plan(stations, specs, begin, end, output_dir, datum="MLLW") -> list:
+    """Stations x product specs -> [Download], in that order."""
+    begin, end = parse_date(begin), parse_date(end)
+    downloads = []
+    for station in stations:
+        for spec in specs:
+            params = {"datum": datum} if datum and spec.product in DATUM_PRODUCTS else {}
+            params.update(spec.params)
+            path = os.path.join(output_dir, spec.filename.format(station=station, product=spec.product))
+            downloads.append(Download(station, spec.product, begin, end, path, params, spec.fallbacks))
+    return downloads
+
+
+class _Progress:
+    """
+    A download being fetched: the parameter set being tried and the state of its windows.
+    Windows are handed out in order but at most REORDER_WINDOWS past the first one not yet
+    written (head), so responses that arrive early wait in a bounded reorder buffer (the
+    ChunkCache: on disk, or in memory with --no-cache) and are streamed to the CsvSink as
+    soon as the windows before them are in.
+    """
+
+    __slots__ = ("index", "download", "cache_root", "since", "header", "variants", "params", "windows", "cache",
+                 "status", "sink", "head", "next_k", "inflight", "failed", "resumed")
+
+    def __init__(self, index: int, download: Download, cache_root: str = None, since: str = None, header: str = None):
+        self.index = index
+        self.download = download
+        self.cache_root = cache_root
+        self.since = since
+        self.header = header
+        self.variants = download.variants()
+        self.params = self.windows = self.cache = self.status = self.sink = None
+        self.head = self.next_k = self.inflight = self.failed = 0
+        self.resumed = 0
+
+    def next_variant(self) -> bool:
+        """Switch to the next parameter set; False when all were tried."""
+        self.params = next(self.variants, None)
+        if self.params is None:
+            return False
+        d = self.download
+        self.windows = plan_windows(d.begin, d.end, window_months(d.product, self.params))
+        folder = cache_folder(self.cache_root, d.station, d.product, self.params) if self.cache_root else None
+        self.cache = ChunkCache(folder)
+        # "data" / "empty" from an earlier run's checkpoints, None = still to fetch
+        self.status = [self.cache.status(b, e) for b, e in self.windows]
+        self.resumed += sum(s is not None for s in self.status)
+        self.sink = CsvSink(d.path, self.since, self.header)
+        self.head = self.next_k = self.inflight = self.failed = 0
+        self._emit()
+        return True
+
+    def _skip_answered(self):
+        while self.next_k < len(self.windows) and self.status[self.next_k] is not None:
+            self.next_k += 1
+
+    def can_dispatch(self) -> bool:
+        self._skip_answered()
+        if self.next_k >= len(self.windows):
+            return False
+        if self.failed:
+            # Nothing more gets written; keep checkpointing the rest for the next run
+            return self.cache.folder is not None
+        return self.next_k < self.head + REORDER_WINDOWS
+
+    def dispatch(self) -> int:
+        k = self.next_k
+        self.next_k += 1
+        self.inflight += 1
+        return k
+
+    def done(self) -> bool:
+        """Nothing in flight and nothing more to hand out: finish() is due."""
+        return self.inflight == 0 and not self.can_dispatch()
+
+    def answer(self, k: int, text):
+        """Checkpoint the response of window k and write whatever is now in order."""
+        b, e = self.windows[k]
+        status = "failed" if text is None else ("data" if is_data(text) else "empty")
+        self.status[k] = self.cache.put(b, e, text, status)
+        self.inflight -= 1
+        if status == "failed":
+            self.failed += 1
+        self._emit()
+
+    def _emit(self):
+        while self.head < len(self.windows) and not self.failed:
+            status = self.status[self.head]
+            if status is None:
+                break
+            if status == "data":
+                b, e = self.windows[self.head]
+                header, lines = parse_csv(self.cache.text(b, e))
+                if header is None:  # checkpoint damaged since it was checked
+                    self.status[self.head] = "failed"
+                    self.failed += 1
+                    break
+                self.sink.write(header, lines)
+                self.cache.release(b, e)
+            self.head += 1
+
+    def finish(self):
+        """All windows answered: DownloadResult, or None after switching to the next parameter set."""
+        d = self.download
+        if self.failed:
+            self.sink.discard()
+            return DownloadResult(d, "failed", params=self.params, failed_windows=self.failed)
+        self.sink.commit()
+        self.cache.clear()
+        sink = self.sink
+        if self.since:
+            # No fallback: another parameter set would append rows of another datum / cadence
+            if sink.rows:
+                return DownloadResult(d, "ok", sink.rows, self.params, resumed=self.resumed, since=self.since)
+            if sink.mismatch:
+                return DownloadResult(d, "header differs", params=self.params, since=self.since)
+            return DownloadResult(d, "up to date", since=self.since)
+        if sink.rows:
+            return DownloadResult(d, "ok", sink.rows, self.params, resumed=self.resumed)
+        if self.next_variant():
+            return None
+        return DownloadResult(d, "no data")
+
+
+async def _run_all(downloads, client: CoopsClient, skip_existing: bool, log, cache_dir, update) -> list:
+    """
+    client.workers coroutines take requests from the open downloads, oldest first, so the
+    request slots stay busy across windows, products and stations alike. A new download is
+    opened only when no open one may hand out a window (all done or waiting on their
+    reorder limit), which keeps the number of open downloads, and their buffers, small; a
+    fallback parameter set keeps its download's place. Responses go to the download's
+    ChunkCache, so only windows without a checkpoint are requested. With `update`, an
+    existing CSV is extended from the day of its last row instead.
+    """
+    results = [None] * len(downloads)
+    active = []
+    todo = iter(enumerate(downloads))
+    roots = set()
+    wakeup = asyncio.Event()
+
+    def done(i, result):
+        results[i] = result
+        if log:
+            print(result.describe(), flush=True)
+
+    def cache_root(d):
+        if cache_dir is False:
+            return None
+        root = cache_dir or os.path.join(os.path.dirname(os.path.abspath(d.path)), CACHE_DIR_NAME)
+        roots.add(root)
+        return root
+
+    def settle(progress):
+        """Finish the download (trying fallbacks) once it is done; drop it from `active`."""
+        while progress.done():
+            result = progress.finish()
+            if result is not None:
+                done(progress.index, result)
+                active.remove(progress)
+                return
+
+    def open_next() -> bool:
+        for i, d in todo:
+            since = last_timestamp(d.path) if update else None
+            if since:
+                d = d.since(since)
+            elif skip_existing and os.path.isfile(d.path):
+                done(i, DownloadResult(d, "skipped"))
+                continue
+            progress = _Progress(i, d, cache_root(d), since, read_header(d.path) if since else None)
+            progress.next_variant()
+            active.append(progress)
+            settle(progress)  # fully checkpointed downloads finish right here
+            return True
+        return False
+
+    def next_request():
+        while True:
+            for progress in active:
+                if progress.can_dispatch():
+                    return progress, progress.dispatch()
+            if not open_next():
+                return None
+
+    async def worker():
+        while True:
+            item = next_request()
+            if item is None:
+                if not active:
+                    wakeup.set()  # all finished: release the waiting workers
+                    return
+                wakeup.clear()
+                await wakeup.wait()  # open downloads are waiting on requests in flight
+                continue
+            progress, k = item
+            d = progress.download
+            b, e = progress.windows[k]
+            text = await client.fetch(d.station, d.product, b, e, progress.params)
+            progress.answer(k, text)
+            settle(progress)
+            wakeup.set()
+
+    async with client:
+        await asyncio.gather(*(worker() for _ in range(client.workers)))
+    for root in roots:
+        try:
+            os.rmdir(root)  # only if no failed download left checkpoints in it
+        except OSError:
+            pass
+    return results
+
+
+def run_downloads(downloads, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, base_url=API_BASE,
+                  skip_existing=False, transport=None, log=True, cache_dir=None, update=False) -> list:
+    """
+    Run downloads concurrently through one client; results in input order. cache_dir:
+    checkpoint root (None = .coops_cache next to each output file, False = in memory only).
+    update: append to existing CSVs only the rows after their last timestamp, up to today.
+    """
+    client = CoopsClient(base_url, workers, rate, transport=transport)
+    results = asyncio.run(_run_all(downloads, client, skip_existing, log, cache_dir, update))
+    if log:
+        counts = {}
+        for r in results:
+            counts[r.status] = counts.get(r.status, 0) + 1
+        summary = ", ".join(f"{n} {status}" for status, n in counts.items())
+        print(f"{summary} | {client.requests} requests, {client.retried} retried, {client.failed} failed")
+    return results
+
+
+def add_client_arguments(parser, workers: int = DEFAULT_WORKERS):
+    parser.add_argument("--workers", "-w", type=int, default=workers,
+                        help="Concurrent API requests, shared by all stations and products (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="Max API requests per second (default: %(default)s; 0 = no limit)")
+    parser.add_argument("--base-url", default=API_BASE,
+                        help="CO-OPS datagetter URL (default: NOAA; e.g. a local coops_stub_server.py)")
+    parser.add_argument("--cache-dir", default=None,
+                        help=f"Folder for per-window checkpoints (default: {CACHE_DIR_NAME}/ in the output folder)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Keep responses in memory only (an interrupted download starts over)")
+    parser.add_argument("--update", "-u", action="store_true",
+                        help="Append to each existing CSV only the rows after its last timestamp, fetched up to "
+                             "today (--begin/--end then apply to new files only)")
+
+
+def download(downloads, args, skip_existing=False) -> list:
+    """run_downloads with the options from add_client_arguments."""
+    cache_dir = False if args.no_cache else args.cache_dir
+    return run_downloads(downloads, args.workers, args.rate, args.base_url, skip_existing, cache_dir=cache_dir,
+                         update=args.update)
+
+
+def any_failed(results) -> bool:
+    return any(r.status in ("failed", "header differs") for r in results)
+
+
+def probe(base_url: str, station: str, product: str, begin, end, params=None):
+    """Print the status and start of one raw response (the scripts' --test)."""
+
+    async def go():
+        async with CoopsClient(base_url, 1, 0, retries=0, timeout=30) as client:
+            query = client.query(station, product, parse_date(begin), parse_date(end), params)
+            return await client.get(query)
+
+    try:
+        status, text, _ = asyncio.run(go())
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    print(f"Status: {status}")
+    print(f"Response (first 800 chars):\n{text[:800]}")
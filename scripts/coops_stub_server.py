@@ -0,0 +1,146 @@
+"""
+Local stand-in for the CO-OPS datagetter, for running the download_noaa_*.py scripts offline.
+
+Replays recorded CSVs: a request for (station, product, begin_date, end_date) is answered with
+the rows of <data-dir>/<station>_<product>.csv whose date falls in [begin_date, end_date]
+(predictions with interval=hilo come from <station>_predictions_daily.csv). Nothing recorded
+for the window gives the API's "No data was found" text, like the real service.
+--error-rate makes that fraction of requests fail with HTTP 503 (exercises the retries),
+--fail-first N fails the first N attempts of every distinct request (the same, but
+deterministic), --latency adds a delay per request and --jitter up to that many seconds
+more at random (so responses come back out of order). Keep-alive (HTTP/1.1) like the real
+API. server.stats counts the responses by status code.
+
+scripts/check_coops_client.py runs coops_client against this stub.
+
+Run from project root:
+  python scripts/coops_stub_server.py --data-dir noaa --port 8765
+  python scripts/download_noaa_water_level.py --base-url http://127.0.0.1:8765/api/prod/datagetter -o /tmp/noaa
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+NO_DATA = "Error: No data was found. This product may not be offered at this station at the requested time."
+NO_PREDICTIONS = "Error: No Predictions data was found. Please make sure the Datum input is valid."
+
+
+def _day(value: str) -> str:
+    """yyyyMMdd from a request date or a CSV timestamp ("YYYY-MM-DD HH:MM")."""
+    value = value.strip()
+    return value[:10].replace("-", "") if "-" in value[:10] else value[:8]
+
+
+class Recordings:
+    """Recorded CSV lines per file, loaded on first use."""
+
+    __slots__ = ("folder", "_files", "_lock")
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def lines(self, name: str):
+        with self._lock:
+            if name not in self._files:
+                path = os.path.join(self.folder, name)
+                if os.path.isfile(path):
+                    with open(path, "r", encoding="utf-8") as f:
+                        lines = [ln.rstrip("\r\n") for ln in f if ln.strip()]
+                    self._files[name] = (lines[0], [(_day(ln), ln) for ln in lines[1:]]) if lines else None
+                else:
+                    self._files[name] = None
+            return self._files[name]
+
+    def answer(self, query: dict) -> str:
+        station, product = query.get("station", ""), query.get("product", "")
+        name = f"{station}_{product}.csv"
+        if product == "predictions" and query.get("interval") == "hilo":
+            name = f"{station}_predictions_daily.csv"
+        recorded = self.lines(name)
+        begin, end = _day(query.get("begin_date", "")), _day(query.get("end_date", ""))
+        rows = [ln for day, ln in recorded[1] if begin <= day <= end] if recorded else []
+        if not rows:
+            return NO_PREDICTIONS if product == "predictions" else NO_DATA
+        return "\n".join([recorded[0]] + rows) + "\n"
+
+
+def make_handler(recordings: Recordings, error_rate: float = 0.0, latency: float = 0.0, log: bool = False,
+                 fail_first: int = 0, jitter: float = 0.0, stats: dict = None):
+    attempts = {}
+    lock = threading.Lock()
+    stats = {} if stats is None else stats
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency or jitter:
+                time.sleep(latency + random.uniform(0, jitter))
+            query = {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+            with lock:
+                key = tuple(sorted(query.items()))
+                attempts[key] = attempts.get(key, 0) + 1
+                early = attempts[key] <= fail_first
+            if early or (error_rate and random.random() < error_rate):
+                status, body = 503, "Service Unavailable"
+            else:
+                status, body = 200, recordings.answer(query)
+            with lock:
+                stats[status] = stats.get(status, 0) + 1
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/csv; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            if log:
+                super().log_message(fmt, *args)
+
+    return Handler
+
+
+def serve(data_dir: str, port: int = 0, error_rate: float = 0.0, latency: float = 0.0, log: bool = False,
+          fail_first: int = 0, jitter: float = 0.0):
+    """
+    Start the stub in a background thread; returns the server (server.server_address[1] is
+    the port, server.stats the {status: responses} counts; server.shutdown() stops it).
+    """
+    stats = {}
+    handler = make_handler(Recordings(data_dir), error_rate, latency, log, fail_first, jitter, stats)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.stats = stats
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    p = argparse.ArgumentParser(description="Replay recorded NOAA CSVs as a local CO-OPS datagetter")
+    p.add_argument("--data-dir", "-d", default="noaa", help="Folder with {station}_{product}.csv recordings")
+    p.add_argument("--port", type=int, default=8765, help="Port (default: %(default)s)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    p.add_argument("--fail-first", type=int, default=0, help="Answer the first N attempts of each request with HTTP 503")
+    p.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request")
+    p.add_argument("--jitter", type=float, default=0.0, help="Up to this many seconds of extra random delay per request")
+    p.add_argument("--log", action="store_true", help="Log every request")
+    args = p.parse_args()
+
+    server = serve(args.data_dir, args.port, args.error_rate, args.latency, args.log, args.fail_first, args.jitter)
+    print(f"CO-OPS stub on http://127.0.0.1:{server.server_address[1]}/api/prod/datagetter "
+          f"(replaying {os.path.abspath(args.data_dir)}); Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,13 @@ Source: PROJECT_ROOT/data/vtec_figures or --source. If not found, use plot_vtec_
 to generate PNGs from docs/vtec_by_usgs_and_noaa/*.csv (output goes directly to docs/images/vtec/).
 """
 import argparse
-import shutil
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DOCS = PROJECT_ROOT / "docs"
 DEFAULT_SOURCE = PROJECT_ROOT / "data" / "vtec_figures"
 VTEC_IMAGES_DIR = DOCS / "images" / "vtec"
+from output_sink import copy_file  # noqa: E402
 
 
 def main():
@@ -27,13 +27,15 @@ def main():
         print(f"Source directory not found: {src_dir}")
         return 1
     VTEC_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-    count = 0
+    count = unchanged = 0
     for f in src_dir.glob("vtec_timeline_*.png"):
         dest = VTEC_IMAGES_DIR / f.name
-        shutil.copy2(f, dest)
+        if not copy_file(f, dest):
+            unchanged += 1
+            continue
         count += 1
         print(f"  {f.name} -> {dest}")
-    print(f"Copied {count} VTEC figures to {VTEC_IMAGES_DIR}")
+    print(f"Copied {count} VTEC figures to {VTEC_IMAGES_DIR} ({unchanged} unchanged)")
     return 0
 
 
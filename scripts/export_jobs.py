@@ -0,0 +1,35 @@
+"""
+Per-station parallelism for the export_* scripts.
+
+--jobs N runs the per-station work (CSV parsing + aggregation, CPU-bound) in a
+ProcessPoolExecutor with N workers; 0 means one per CPU, 1 (default) stays in-process.
+Results come back in submission order (Executor.map), so the merged output is identical
+to a serial run whatever the worker count or completion order.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def add_jobs_argument(parser):
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Worker processes for per-station work (0 = one per CPU, default 1 = serial)",
+    )
+
+
+def job_count(jobs: int) -> int:
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+def map_ordered(fn, items, jobs: int = 1) -> list:
+    """[fn(*item) for item in items], with up to `jobs` processes; results in input order."""
+    items = list(items)
+    workers = min(job_count(jobs), len(items))
+    if workers <= 1:
+        return [fn(*item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *zip(*items)))
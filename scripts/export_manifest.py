@@ -0,0 +1,175 @@
+"""
+Incremental exports: per-station fragments keyed on input fingerprints.
+
+Each export keeps a folder under .export_cache/<name>/ with one JSON fragment per station
+(that station's part of "series") and a manifest.json recording, per station, the
+fingerprint of every input file it was built from: mtime_ns, size and SHA-256 (None for
+a file that did not exist). A station is reused when all its inputs still match (same
+mtime+size, or same size+SHA-256 after a touch/copy, as in discharge_store) and the
+export parameters (options such as --resample, plus a hash of the exporting code) are
+unchanged; everything else is recomputed and the output is reassembled from fragments.
+
+    manifest = ExportManifest("water_level", params, code=[__file__], full=args.full)
+    results = run_incremental(manifest, station_series, [(sta, inputs, fn_args), ...], args.jobs)
+
+run_incremental looks every station up, builds only the misses (through map_ordered, so
+--jobs applies), stores their fragments and saves the manifest.
+
+--full (add_cache_argument) ignores the cached fragments and rebuilds all of them.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from export_jobs import map_ordered
+
+MANIFEST_VERSION = 1
+CACHE_ROOT = Path(__file__).resolve().parent.parent / ".export_cache"
+
+
+def add_cache_argument(parser):
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild every station instead of reusing unchanged ones from .export_cache/",
+    )
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def code_version(paths) -> str:
+    """Hash of the exporting modules' sources, so editing the code invalidates the fragments."""
+    h = hashlib.sha1()
+    for p in paths:
+        h.update(Path(p).read_bytes())
+    return h.hexdigest()
+
+
+def _write_json(path: Path, obj):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+class ExportManifest:
+    """Fragment cache for one export (see module docstring)."""
+
+    __slots__ = ("folder", "params", "entries", "rebuilt", "reused", "_old")
+
+    def __init__(self, name: str, params: dict, code=(), full: bool = False, root: Path = CACHE_ROOT):
+        self.folder = Path(root) / name
+        self.params = dict(params, code=code_version(code))
+        self.entries = {}
+        self.rebuilt = 0
+        self.reused = 0
+        self._old = {}
+        if full:
+            return
+        try:
+            with open(self.folder / "manifest.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("version") == MANIFEST_VERSION and meta.get("params") == self.params:
+            self._old = meta.get("entries", {})
+
+    def _fragment_path(self, key: str) -> Path:
+        return self.folder / f"{key}.json"
+
+    def _fresh(self, path: Path, recorded) -> bool:
+        try:
+            st = path.stat()
+        except OSError:
+            return recorded is None
+        if recorded is None or recorded["size"] != st.st_size:
+            return False
+        if recorded["mtime_ns"] == st.st_mtime_ns:
+            return True
+        if recorded["sha256"] != _file_sha256(path):
+            return False
+        recorded["mtime_ns"] = st.st_mtime_ns  # touched / copied: remember the new mtime
+        return True
+
+    def lookup(self, key: str, inputs):
+        """(True, fragment) if `key` was built from the same inputs, else (False, None)."""
+        entry = self._old.get(key)
+        if entry is None:
+            return False, None
+        recorded = entry.get("inputs", {})
+        if sorted(recorded) != sorted(str(p) for p in inputs):
+            return False, None
+        if not all(self._fresh(Path(p), recorded[str(p)]) for p in inputs):
+            return False, None
+        try:
+            with open(self._fragment_path(key), "r", encoding="utf-8") as f:
+                fragment = json.load(f)
+        except (OSError, ValueError):
+            return False, None
+        self.entries[key] = entry
+        self.reused += 1
+        return True, fragment
+
+    def store(self, key: str, inputs, fragment):
+        """Record a freshly built fragment (None for a station without data) and its inputs."""
+        recorded = {}
+        for p in inputs:
+            p = Path(p)
+            try:
+                st = p.stat()
+            except OSError:
+                recorded[str(p)] = None
+                continue
+            recorded[str(p)] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": _file_sha256(p)}
+        self.folder.mkdir(parents=True, exist_ok=True)
+        _write_json(self._fragment_path(key), fragment)
+        self.entries[key] = {"inputs": recorded}
+        self.rebuilt += 1
+
+    def save(self, keys=None):
+        """Write manifest.json (last, so it never points at missing fragments); prune other keys."""
+        if keys is not None:
+            keep = set(keys)
+            for key in list(self.entries):
+                if key not in keep:
+                    del self.entries[key]
+        self.folder.mkdir(parents=True, exist_ok=True)
+        for path in self.folder.glob("*.json"):
+            if path.name != "manifest.json" and path.stem not in self.entries:
+                path.unlink(missing_ok=True)
+        _write_json(
+            self.folder / "manifest.json",
+            {"version": MANIFEST_VERSION, "params": self.params, "entries": self.entries},
+        )
+
+    def summary(self) -> str:
+        return f"{self.rebuilt} rebuilt, {self.reused} unchanged"
+
+
+def run_incremental(manifest: ExportManifest, fn, jobs, workers: int = 1) -> list:
+    """
+    jobs: [(key, input paths, fn args)] -> [fragment per job] in order; cached fragments are
+    reused, the rest are fn(*args) (in `workers` processes) and stored.
+    """
+    results = [None] * len(jobs)
+    todo = []
+    for i, (key, inputs, _) in enumerate(jobs):
+        hit, fragment = manifest.lookup(key, inputs)
+        if hit:
+            results[i] = fragment
+        else:
+            todo.append(i)
+    built = map_ordered(fn, [jobs[i][2] for i in todo], workers)
+    for i, fragment in zip(todo, built):
+        key, inputs, _ = jobs[i]
+        manifest.store(key, inputs, fragment)
+        results[i] = fragment
+    manifest.save([key for key, _, _ in jobs])
+    return results
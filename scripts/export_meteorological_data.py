@@ -1,7 +1,14 @@
-"""Export NOAA meteorological data per station to JSON for Chart.js."""
-import json
+"""
+Export NOAA meteorological data per station to JSON for Chart.js (or parquet/arrow with one
+row per value: station_id, product, kind, date, value; see export_writer.py).
+
+Points are aggregated to daily mean/min/max by default; --resample sets hourly / raw per
+product (see series_resample.py), e.g. --resample wind=hourly:max --resample water_level=raw.
+--jobs N processes stations in N worker processes (see export_jobs.py); stations whose
+CSVs did not change are reused from .export_cache/ (see export_manifest.py, --full rebuilds).
+"""
+import argparse
 import sys
-from datetime import datetime
 from pathlib import Path
 
 _SCRIPT_DIR = Path(__file__).resolve().parent
@@ -9,6 +16,12 @@ PROJECT_ROOT = _SCRIPT_DIR.parent
 DEFAULT_INPUT = PROJECT_ROOT / "noaa"
 OUTPUT_FRONTEND = PROJECT_ROOT / "frontend" / "data" / "meteorological_data.json"
 OUTPUT_DOCS = PROJECT_ROOT / "docs" / "data" / "meteorological_data.json"
+from export_water_level_data import _find_col, load_observations, load_predictions, parse_times  # noqa: E402
+from export_jobs import add_jobs_argument  # noqa: E402
+from export_manifest import ExportManifest, add_cache_argument, run_incremental  # noqa: E402
+from export_writer import add_format_argument, write_export  # noqa: E402
+from series_resample import add_resample_argument, describe, resample_config, series_records  # noqa: E402
+
 PRODUCTS = ["air_temperature", "wind", "air_pressure", "water_temperature", "humidity", "visibility"]
 COL_CANDIDATES = {
     "air_temperature": ["Air Temperature", "air temperature", "Air Temp", "t"],
@@ -18,29 +31,77 @@ COL_CANDIDATES = {
     "humidity": ["Humidity", "humidity", "Relative Humidity", "v"],
     "visibility": ["Visibility", "visibility", "v"],
 }
+# --resample products: the met products plus the water level panel's observations and predictions
+RESAMPLE_PRODUCTS = PRODUCTS + ["water_level", "predictions"]
+# Sources whose edits invalidate the cached per-station fragments
+CODE_FILES = [Path(__file__), _SCRIPT_DIR / "export_water_level_data.py", _SCRIPT_DIR / "series_resample.py"]
 
 
-def parse_dt(s):
-    s = str(s).strip()
-    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(s[:19], fmt)
-        except ValueError:
-            continue
-    return None
+def load_product(path, product):
+    """Product CSV -> DataFrame (dt, value) without unparsable rows; None if unusable."""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    if df.empty or len(df.columns) < 2:
+        return None
+    tcol = _find_col(df, ["Date Time", "DateTime", "date_time", "t"]) or df.columns[0]
+    vcol = _find_col(df, COL_CANDIDATES[product]) or df.columns[1]
+    out = pd.DataFrame({"dt": parse_times(df[tcol]), "value": pd.to_numeric(df[vcol], errors="coerce")})
+    return out.dropna(subset=["dt", "value"])
+
 
+def water_level_panel(wl_path, pred_path, config):
+    """{verified, preliminary, predictions} at 3 decimals; None if the water level CSV is unusable."""
+    obs = load_observations(wl_path)
+    if obs is None:
+        return None
+    spec = config["water_level"]
+    q = obs["quality"]
+    verified = series_records(obs["dt"][q.eq("v")], obs["value"][q.eq("v")], spec, ndigits=3)
+    preliminary = series_records(obs["dt"][q.eq("p")], obs["value"][q.eq("p")], spec, ndigits=3)
+    predictions = []
+    pred = load_predictions(pred_path)
+    if pred is not None:
+        predictions = series_records(pred["dt"], pred["value"], config["predictions"], ndigits=3)
+    return {"verified": verified, "preliminary": preliminary, "predictions": predictions}
 
-def _find_col(df, candidates):
-    for c in candidates:
-        if c in df.columns:
-            return c
-    for c in df.columns:
-        if str(c).strip().lower() in [x.lower() for x in candidates]:
-            return c
-    return None
+
+def station_inputs(sta) -> list:
+    """Every CSV station_panels may read for `sta` (present or not)."""
+    names = [f"{sta}_{product}.csv" for product in PRODUCTS] + [f"{sta}_water_level.csv", f"{sta}_predictions.csv"]
+    return [DEFAULT_INPUT / name for name in names]
+
+
+def station_panels(sta, config) -> dict:
+    """{product: records, "water_level": panel} for one station (empty if it has no data)."""
+    panels = {}
+    for product in PRODUCTS:
+        path = DEFAULT_INPUT / f"{sta}_{product}.csv"
+        if not path.exists():
+            continue
+        df = load_product(path, product)
+        if df is None:
+            continue
+        arr = series_records(df["dt"], df["value"], config[product], ndigits=2)
+        if arr:
+            panels[product] = arr
+    wl_path = DEFAULT_INPUT / f"{sta}_water_level.csv"
+    pred_path = DEFAULT_INPUT / f"{sta}_predictions.csv"
+    if wl_path.exists():
+        panel = water_level_panel(wl_path, pred_path, config)
+        if panel is not None:
+            panels["water_level"] = panel
+    return panels
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Export NOAA meteorological data per station")
+    add_format_argument(parser)
+    add_resample_argument(parser, RESAMPLE_PRODUCTS)
+    add_jobs_argument(parser)
+    add_cache_argument(parser)
+    args = parser.parse_args()
+    config = resample_config(parser, args.resample, RESAMPLE_PRODUCTS)
     try:
         import pandas as pd
     except ImportError:
@@ -53,58 +114,21 @@ def main():
     df_sta = pd.read_csv(noaa_csv)
     col_id = next((c for c in df_sta.columns if str(c).lower().strip() == "id"), df_sta.columns[0])
     stations = [str(v).strip() for v in df_sta[col_id].dropna().unique() if str(v).strip().isdigit()]
-    series = {}
-    for sta in stations:
-        panels = {}
-        for product in PRODUCTS:
-            path = DEFAULT_INPUT / f"{sta}_{product}.csv"
-            if not path.exists():
-                continue
-            df = pd.read_csv(path)
-            if df.empty or len(df.columns) < 2:
-                continue
-            tcol = _find_col(df, ["Date Time", "DateTime", "date_time", "t"]) or df.columns[0]
-            vcol = _find_col(df, COL_CANDIDATES[product]) or df.columns[1]
-            df["dt"] = df[tcol].apply(parse_dt)
-            df["value"] = pd.to_numeric(df[vcol], errors="coerce")
-            df = df.dropna(subset=["dt", "value"])
-            arr = [{"date": r["dt"].strftime("%Y-%m-%d"), "value": round(float(r["value"]), 2)} for _, r in df.iterrows()]
-            if arr:
-                panels[product] = arr
-        wl_path = DEFAULT_INPUT / f"{sta}_water_level.csv"
-        pred_path = DEFAULT_INPUT / f"{sta}_predictions.csv"
-        if wl_path.exists():
-            wl_df = pd.read_csv(wl_path)
-            if not wl_df.empty and len(wl_df.columns) >= 2:
-                tcol = _find_col(wl_df, ["Date Time", "DateTime"]) or wl_df.columns[0]
-                vcol = _find_col(wl_df, ["Water Level", " water level"]) or wl_df.columns[1]
-                qcol = _find_col(wl_df, ["Quality", " quality"])
-                wl_df["dt"] = wl_df[tcol].apply(parse_dt)
-                wl_df["value"] = pd.to_numeric(wl_df[vcol], errors="coerce")
-                wl_df["q"] = wl_df[qcol].astype(str).str.strip().str.lower() if qcol else "v"
-                wl_df = wl_df.dropna(subset=["dt", "value"])
-                verified = [{"date": r["dt"].strftime("%Y-%m-%d"), "value": round(float(r["value"]), 3)} for _, r in wl_df.iterrows() if r["q"] == "v"]
-                preliminary = [{"date": r["dt"].strftime("%Y-%m-%d"), "value": round(float(r["value"]), 3)} for _, r in wl_df.iterrows() if r["q"] == "p"]
-                predictions = []
-                if pred_path.exists():
-                    pdf = pd.read_csv(pred_path)
-                    if not pdf.empty and len(pdf.columns) >= 2:
-                        tcol = _find_col(pdf, ["Date Time", "DateTime"]) or pdf.columns[0]
-                        pdf["dt"] = pdf[tcol].apply(parse_dt)
-                        pdf["value"] = pd.to_numeric(pdf[pdf.columns[1]], errors="coerce")
-                        pdf = pdf.dropna(subset=["dt", "value"])
-                        predictions = [{"date": r["dt"].strftime("%Y-%m-%d"), "value": round(float(r["value"]), 3)} for _, r in pdf.iterrows()]
-                panels["water_level"] = {"verified": verified, "preliminary": preliminary, "predictions": predictions}
-        if panels:
-            series[sta] = panels
-    out = {"series": series}
-    OUTPUT_FRONTEND.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_DOCS.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FRONTEND, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    with open(OUTPUT_DOCS, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    print(f"Exported meteorological for {len(series)} stations")
+    jobs = [(sta, station_inputs(sta), (sta, config)) for sta in stations]
+    manifest = ExportManifest("meteorological", {"resample": describe(config)}, CODE_FILES, args.full)
+    results = run_incremental(manifest, station_panels, jobs, args.jobs)
+    series = {sta: panels for sta, panels in zip(stations, results) if panels}
+    out = {"resample": describe(config), "series": series}
+    write_export(
+        out,
+        series,
+        [OUTPUT_FRONTEND, OUTPUT_DOCS],
+        args.format,
+        ("station_id", "product", "kind"),
+        {"resample": describe(config)},
+        shards=args.shards,
+    )
+    print(f"Exported meteorological for {len(series)} stations ({manifest.summary()})")
 
 
 if __name__ == "__main__":
@@ -4,12 +4,12 @@ Reads from PROJECT_ROOT/noaa/noaa_stations_in_domain.csv (or --input).
 Output: frontend/data/noaa_stations.json, docs/data/noaa_stations.json
 """
 import csv
-import json
 import sys
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_INPUT = PROJECT_ROOT / "noaa" / "noaa_stations_in_domain.csv"
+from output_sink import write_json  # noqa: E402
 
 
 def main():
@@ -39,12 +39,9 @@ def main():
                 "url": row.get("url", "").strip(),
             })
     out = {"stations": stations}
-    for subdir in ["frontend", "docs"]:
-        d = PROJECT_ROOT / subdir / "data"
-        d.mkdir(parents=True, exist_ok=True)
-        p = d / "noaa_stations.json"
-        with open(p, "w", encoding="utf-8") as f:
-            json.dump(out, f, indent=2)
+    targets = [PROJECT_ROOT / subdir / "data" / "noaa_stations.json" for subdir in ["frontend", "docs"]]
+    write_json(out, targets)
+    for p in targets:
         print(f"Exported {len(stations)} NOAA stations to {p}")
 
 
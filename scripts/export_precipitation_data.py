@@ -1,6 +1,9 @@
-"""Export precipitation (GPM IMERG) per NOAA station to JSON for Chart.js."""
+"""
+Export precipitation (GPM IMERG) per NOAA station to JSON for Chart.js (or parquet/arrow, see export_writer.py).
+Stations whose pr_<id>.csv did not change are reused from .export_cache/ (see export_manifest.py; --full rebuilds).
+"""
+import argparse
 import csv
-import json
 import math
 import sys
 from pathlib import Path
@@ -11,6 +14,11 @@ NOAA_CSV = PROJECT_ROOT / "noaa" / "noaa_stations_in_domain.csv"
 PR_EXTRACTED = PROJECT_ROOT / "pr_extracted"
 OUTPUT_FRONTEND = PROJECT_ROOT / "frontend" / "data" / "precipitation_data.json"
 OUTPUT_DOCS = PROJECT_ROOT / "docs" / "data" / "precipitation_data.json"
+from export_manifest import ExportManifest, add_cache_argument, run_incremental  # noqa: E402
+from export_writer import add_format_argument, write_export  # noqa: E402
+
+# Sources whose edits invalidate the cached per-station fragments
+CODE_FILES = [Path(__file__)]
 
 
 def load_noaa(path):
@@ -53,9 +61,25 @@ def nearest(noaa_lat, noaa_lon, pr_locs):
     return best_id
 
 
+def station_precipitation(pr_path):
+    """[{date, value}] from one pr_<id>.csv; None if it has no usable data."""
+    import pandas as pd
+
+    df = pd.read_csv(pr_path)
+    if df.empty or "date" not in df.columns:
+        return None
+    pr_col = "pr_mm_per_day" if "pr_mm_per_day" in df.columns else df.columns[-1]
+    arr = [{"date": str(r["date"])[:10], "value": round(float(r[pr_col]), 2)} for _, r in df.iterrows()]
+    return arr or None
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Export GPM IMERG precipitation per NOAA station")
+    add_format_argument(parser)
+    add_cache_argument(parser)
+    args = parser.parse_args()
     try:
-        import pandas as pd
+        import pandas  # noqa: F401
     except ImportError:
         print("Install: pip install pandas", file=sys.stderr)
         sys.exit(1)
@@ -68,27 +92,21 @@ def main():
         sys.exit(1)
     noaa = load_noaa(NOAA_CSV)
     pr_locs = load_pr_locations(pr_all)
-    series = {}
+    jobs = []
     for s in noaa:
         usgs_id = nearest(s["lat"], s["lon"], pr_locs)
         pr_path = PR_EXTRACTED / f"pr_{usgs_id}.csv"
-        if not pr_path.exists():
-            continue
-        df = pd.read_csv(pr_path)
-        if df.empty or "date" not in df.columns:
-            continue
-        pr_col = "pr_mm_per_day" if "pr_mm_per_day" in df.columns else df.columns[-1]
-        arr = [{"date": str(r["date"])[:10], "value": round(float(r[pr_col]), 2)} for _, r in df.iterrows()]
+        if pr_path.exists():
+            jobs.append((s["id"], [pr_path], (pr_path,)))
+    manifest = ExportManifest("precipitation", {}, CODE_FILES, args.full)
+    results = run_incremental(manifest, station_precipitation, jobs)
+    series = {}
+    for (sid, _, _), arr in zip(jobs, results):
         if arr:
-            series[s["id"]] = arr
+            series[sid] = arr
     out = {"series": series}
-    OUTPUT_FRONTEND.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_DOCS.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FRONTEND, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    with open(OUTPUT_DOCS, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    print(f"Exported precipitation for {len(series)} stations")
+    write_export(out, series, [OUTPUT_FRONTEND, OUTPUT_DOCS], args.format, ("station_id",), shards=args.shards)
+    print(f"Exported precipitation for {len(series)} stations ({manifest.summary()})")
 
 
 if __name__ == "__main__":
@@ -3,12 +3,12 @@ Export sensors from sensors.txt to JSON for the Hydrological Modeling map.
 Reads tab-separated: Station Name, Latitude, Longitude, Sensor Type.
 Output: frontend/data/sensors_data.json, docs/data/sensors_data.json
 """
-import json
 import sys
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_INPUT = PROJECT_ROOT / "sensors.txt"
+from output_sink import write_json  # noqa: E402
 
 
 def main():
@@ -46,12 +46,9 @@ def main():
             "sensorType": parts[3].strip().lower(),
         })
     out = {"sensors": sensors}
-    for subdir in ["frontend", "docs"]:
-        d = PROJECT_ROOT / subdir / "data"
-        d.mkdir(parents=True, exist_ok=True)
-        p = d / "sensors_data.json"
-        with open(p, "w", encoding="utf-8") as f:
-            json.dump(out, f, indent=2)
+    targets = [PROJECT_ROOT / subdir / "data" / "sensors_data.json" for subdir in ["frontend", "docs"]]
+    write_json(out, targets)
+    for p in targets:
         print(f"Exported {len(sensors)} sensors to {p}")
 
 
@@ -6,7 +6,6 @@ Output: frontend/data/storms_data.json
 Each storm has: id, name, startDate, endDate, displayLabel
 Multi-point storms (e.g. HENRI) get min/max date range from all points.
 """
-import json
 import os
 from collections import defaultdict
 from datetime import datetime
@@ -15,6 +14,8 @@ INPUT = os.path.join(os.path.dirname(__file__), "..", "events", "hist_hurr_2010_
 OUTPUT_FRONTEND = os.path.join(os.path.dirname(__file__), "..", "frontend", "data", "storms_data.json")
 OUTPUT_DOCS = os.path.join(os.path.dirname(__file__), "..", "docs", "data", "storms_data.json")
 
+from output_sink import write_json  # noqa: E402
+
 # Nominal duration in days for single-point events (used when only one date exists)
 SINGLE_POINT_DAYS = 2
 
@@ -110,12 +111,7 @@ def main():
     storms.sort(key=lambda s: s["startDate"])
 
     out = {"storms": storms}
-    os.makedirs(os.path.dirname(OUTPUT_FRONTEND), exist_ok=True)
-    os.makedirs(os.path.dirname(OUTPUT_DOCS), exist_ok=True)
-    with open(OUTPUT_FRONTEND, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    with open(OUTPUT_DOCS, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
+    write_json(out, [OUTPUT_FRONTEND, OUTPUT_DOCS])
     print(f"Exported {len(storms)} storms to {OUTPUT_FRONTEND}")
 
 
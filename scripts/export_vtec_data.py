@@ -3,7 +3,6 @@ Export VTEC events per station to JSON for Chart.js.
 Reads from docs/vtec_by_usgs_and_noaa/vtec_events_<STAID>.csv
 Output: frontend/data/vtec_data.json
 """
-import json
 import os
 import re
 import sys
@@ -15,6 +14,7 @@ PROJECT_ROOT = _SCRIPT_DIR.parent
 DEFAULT_INPUT = PROJECT_ROOT / "docs" / "vtec_by_usgs_and_noaa"
 OUTPUT_FRONTEND = PROJECT_ROOT / "frontend" / "data" / "vtec_data.json"
 OUTPUT_DOCS = PROJECT_ROOT / "docs" / "data" / "vtec_data.json"
+from output_sink import write_json  # noqa: E402
 
 ALLOWED = [
     "Severe Thunderstorm Warning",
@@ -78,12 +78,7 @@ def main():
                 series[unpadded] = arr
 
     out = {"series": series, "warning_order": ALLOWED}
-    OUTPUT_FRONTEND.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_DOCS.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FRONTEND, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    with open(OUTPUT_DOCS, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
+    write_json(out, [OUTPUT_FRONTEND, OUTPUT_DOCS])
     print(f"Exported VTEC for {len(series)} stations")
 
 
@@ -1,13 +1,21 @@
 """
 Export NOAA water level + predictions to JSON for Chart.js.
 Reads from noaa/*.csv. Output: frontend/data/water_level_data.json, docs/data/water_level_data.json
+(or .parquet / .arrow with one row per value: station_id, kind, date, value; see export_writer.py)
 
-Run: python scripts/export_water_level_data.py
+Points are aggregated to daily mean/min/max by default; --resample picks hourly or raw
+(per product: water_level covers verified/preliminary/residual; see series_resample.py).
+--jobs N processes stations in N worker processes (see export_jobs.py); stations whose
+CSVs did not change are reused from .export_cache/ (see export_manifest.py, --full rebuilds).
+
+Column-at-a-time pandas: timestamps via pd.to_datetime with explicit formats, verified /
+preliminary via a boolean mask, residuals via merge_asof on the timestamp (no per-row
+Python). scripts/benchmark_export_water_level.py measures it against the old per-row code.
+
+Run: python scripts/export_water_level_data.py [--format json|parquet|arrow] [--resample ...] [--jobs N]
 """
-import json
-import os
+import argparse
 import sys
-from datetime import datetime
 from pathlib import Path
 
 _SCRIPT_DIR = Path(__file__).resolve().parent
@@ -15,16 +23,33 @@ PROJECT_ROOT = _SCRIPT_DIR.parent
 DEFAULT_INPUT = PROJECT_ROOT / "noaa"
 OUTPUT_FRONTEND = PROJECT_ROOT / "frontend" / "data" / "water_level_data.json"
 OUTPUT_DOCS = PROJECT_ROOT / "docs" / "data" / "water_level_data.json"
+from export_jobs import add_jobs_argument  # noqa: E402
+from export_manifest import ExportManifest, add_cache_argument, run_incremental  # noqa: E402
+from export_writer import add_format_argument, write_export  # noqa: E402
+from series_resample import add_resample_argument, describe, resample_config, series_records  # noqa: E402
 
+PRODUCTS = ["water_level", "predictions"]
+# Sources whose edits invalidate the cached per-station fragments
+CODE_FILES = [Path(__file__), _SCRIPT_DIR / "series_resample.py"]
 
-def parse_dt(s):
-    s = str(s).strip()
-    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(s[:19], fmt)
-        except ValueError:
-            continue
-    return None
+# Tried in order per value (as the old per-row parse_dt did)
+TIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+# An observation is compared with the prediction at the same time (half the 6-minute interval)
+RESIDUAL_TOLERANCE = "3min"
+
+
+def parse_times(values):
+    """Vectorized timestamp parsing: first of TIME_FORMATS that fits each value, NaT if none does."""
+    import pandas as pd
+
+    s = values.astype(str).str.strip().str[:19]
+    out = pd.to_datetime(s, format=TIME_FORMATS[0], errors="coerce")
+    for fmt in TIME_FORMATS[1:]:
+        missing = out.isna()
+        if not missing.any():
+            break
+        out[missing] = pd.to_datetime(s[missing], format=fmt, errors="coerce")
+    return out
 
 
 def _find_col(df, candidates):
@@ -37,7 +62,88 @@ def _find_col(df, candidates):
     return None
 
 
+def load_observations(path):
+    """
+    Water level CSV -> DataFrame (dt, value, quality, preliminary) without unparsable rows;
+    None if unusable. quality is the lower-cased Quality flag ("v" if there is no such column).
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    if df.empty or len(df.columns) < 2:
+        return None
+    time_col = _find_col(df, ["Date Time", "DateTime", "date time"]) or df.columns[0]
+    value_col = _find_col(df, ["Water Level", " water level"]) or df.columns[1]
+    quality_col = _find_col(df, ["Quality", " quality"])
+    out = pd.DataFrame({"dt": parse_times(df[time_col]), "value": pd.to_numeric(df[value_col], errors="coerce")})
+    out["quality"] = df[quality_col].astype(str).str.strip().str.lower() if quality_col else "v"
+    out["preliminary"] = out["quality"].eq("p")
+    return out.dropna(subset=["dt", "value"])
+
+
+def load_predictions(path):
+    """Predictions CSV -> DataFrame (dt, value); None if missing or unusable."""
+    import pandas as pd
+
+    if not path.exists():
+        return None
+    df = pd.read_csv(path)
+    if df.empty or len(df.columns) < 2:
+        return None
+    tcol = _find_col(df, ["Date Time", "DateTime"]) or df.columns[0]
+    out = pd.DataFrame({"dt": parse_times(df[tcol]), "value": pd.to_numeric(df[df.columns[1]], errors="coerce")})
+    return out.dropna(subset=["dt", "value"])
+
+
+def residuals(obs, pred):
+    """Observed minus predicted at the same time: (dt, value) for every observation with a prediction."""
+    import pandas as pd
+
+    left = obs[["dt", "value"]].sort_values("dt", kind="stable")
+    right = pred[["dt", "value"]].rename(columns={"value": "pred"}).sort_values("dt", kind="stable")
+    merged = pd.merge_asof(left, right, on="dt", direction="nearest", tolerance=pd.Timedelta(RESIDUAL_TOLERANCE))
+    merged = merged.dropna(subset=["pred"])
+    return merged["dt"], merged["value"] - merged["pred"]
+
+
+def station_series(wl_path, pred_path, config=None):
+    """
+    {verified, preliminary, predictions, residual} record lists for one station; None if no data.
+    config: {product: (resolution, stats)} from resample_config; default is raw (one record per row).
+    """
+    config = config or {}
+    wl_spec = config.get("water_level", ("raw", ()))
+    obs = load_observations(wl_path)
+    if obs is None:
+        return None
+    prelim = obs["preliminary"].to_numpy()
+    verified = series_records(obs["dt"][~prelim], obs["value"][~prelim], wl_spec)
+    preliminary = series_records(obs["dt"][prelim], obs["value"][prelim], wl_spec)
+
+    pred = load_predictions(pred_path)
+    predictions, residual = [], []
+    if pred is not None and not pred.empty:
+        predictions = series_records(pred["dt"], pred["value"], config.get("predictions", ("raw", ())))
+        residual = series_records(*residuals(obs, pred), wl_spec, ndigits=4)
+
+    if verified or preliminary or predictions or residual:
+        return {
+            "verified": verified,
+            "preliminary": preliminary,
+            "predictions": predictions,
+            "residual": residual,
+        }
+    return None
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Export NOAA water level + predictions")
+    add_format_argument(parser)
+    add_resample_argument(parser, PRODUCTS)
+    add_jobs_argument(parser)
+    add_cache_argument(parser)
+    args = parser.parse_args()
+    config = resample_config(parser, args.resample, PRODUCTS)
     try:
         import pandas as pd
     except ImportError:
@@ -52,74 +158,27 @@ def main():
     col_id = next((c for c in df_sta.columns if str(c).lower().strip() == "id"), df_sta.columns[0])
     stations = [str(v).strip() for v in df_sta[col_id].dropna().unique() if str(v).strip().isdigit()]
 
-    series = {}
+    jobs = []
     for sta in stations:
         wl_path = DEFAULT_INPUT / f"{sta}_water_level.csv"
         pred_path = DEFAULT_INPUT / f"{sta}_predictions.csv"
-        if not wl_path.exists():
-            continue
-
-        df = pd.read_csv(wl_path)
-        if df.empty or len(df.columns) < 2:
-            continue
-        time_col = _find_col(df, ["Date Time", "DateTime", "date time"]) or df.columns[0]
-        value_col = _find_col(df, ["Water Level", " water level"]) or df.columns[1]
-        quality_col = _find_col(df, ["Quality", " quality"])
-        df["dt"] = df[time_col].apply(parse_dt)
-        df["value"] = pd.to_numeric(df[value_col], errors="coerce")
-        df["quality"] = df[quality_col].astype(str).str.strip().str.lower() if quality_col else "v"
-        df = df.dropna(subset=["dt", "value"])
-
-        verified = []
-        preliminary = []
-        for _, r in df.iterrows():
-            d = r["dt"].strftime("%Y-%m-%d") if hasattr(r["dt"], "strftime") else str(r["dt"])[:10]
-            v = float(r["value"])
-            if (r["quality"] if quality_col else "v").strip().lower() == "p":
-                preliminary.append({"date": d, "value": v})
-            else:
-                verified.append({"date": d, "value": v})
-
-        predictions = []
-        if pred_path.exists():
-            pdf = pd.read_csv(pred_path)
-            if not pdf.empty and len(pdf.columns) >= 2:
-                tcol = _find_col(pdf, ["Date Time", "DateTime"]) or pdf.columns[0]
-                vcol = pdf.columns[1]
-                pdf["dt"] = pdf[tcol].apply(parse_dt)
-                pdf["value"] = pd.to_numeric(pdf[vcol], errors="coerce")
-                pdf = pdf.dropna(subset=["dt", "value"])
-                for _, r in pdf.iterrows():
-                    d = r["dt"].strftime("%Y-%m-%d") if hasattr(r["dt"], "strftime") else str(r["dt"])[:10]
-                    predictions.append({"date": d, "value": float(r["value"])})
-
-        obs_df = df[["dt", "value"]].copy()
-        obs_df.columns = ["dt", "obs"]
-        pred_df = pd.DataFrame(predictions)
-        if not pred_df.empty:
-            pred_df["dt"] = pd.to_datetime(pred_df["date"])
-            merged = obs_df.merge(pred_df.rename(columns={"value": "pred"}), left_on="dt", right_on="dt", how="inner")
-            residual = [{"date": r["dt"].strftime("%Y-%m-%d") if hasattr(r["dt"], "strftime") else str(r["dt"])[:10],
-                        "value": round(float(r["obs"]) - float(r["pred"]), 4)} for _, r in merged.iterrows()]
-        else:
-            residual = []
-
-        if verified or preliminary or predictions or residual:
-            series[sta] = {
-                "verified": verified,
-                "preliminary": preliminary,
-                "predictions": predictions,
-                "residual": residual,
-            }
-
-    out = {"series": series}
-    OUTPUT_FRONTEND.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_DOCS.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FRONTEND, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    with open(OUTPUT_DOCS, "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2)
-    print(f"Exported water level data for {len(series)} stations")
+        if wl_path.exists():
+            jobs.append((sta, [wl_path, pred_path], (wl_path, pred_path, config)))
+    manifest = ExportManifest("water_level", {"resample": describe(config)}, CODE_FILES, args.full)
+    results = run_incremental(manifest, station_series, jobs, args.jobs)
+    series = {sta: data for (sta, _, _), data in zip(jobs, results) if data is not None}
+
+    out = {"resample": describe(config), "series": series}
+    write_export(
+        out,
+        series,
+        [OUTPUT_FRONTEND, OUTPUT_DOCS],
+        args.format,
+        ("station_id", "kind"),
+        {"resample": describe(config)},
+        shards=args.shards,
+    )
+    print(f"Exported water level data for {len(series)} stations ({manifest.summary()})")
 
 
 if __name__ == "__main__":
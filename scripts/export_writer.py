@@ -0,0 +1,210 @@
+"""
+Shared output writer for the export_* scripts.
+
+--format json (default) writes the nested {"series": ...} JSON the frontend reads.
+--format parquet / arrow write the same data as one flat table per dataset (one row per
+value: station_id, the dataset's grouping columns such as kind or product, date, value),
+so notebooks and the backend can load it with pyarrow/pandas without parsing and read
+only the columns they need. Needs pyarrow; the output file keeps the JSON file's name
+with a .parquet / .arrow extension. Aggregated series (series_resample.py) add min / max
+columns; hourly dates are stored as timestamps instead of date32.
+
+--shards additionally writes the dataset per station for the static frontend, next to
+the JSON file: data/<dataset>/<station_id>.json (that station's part of "series",
+compact JSON) and data/<dataset>/index.json listing the shards with their date extent,
+record count and byte size, e.g. data/precipitation/8444069.json. A page can then fetch
+the index plus the one station the user opens instead of the whole dataset. An export
+without --shards removes the shards of an earlier one, since the frontend prefers
+index.json over the JSON file and would keep showing the old data.
+
+Every file is serialized once and fanned out to its targets through output_sink.py
+(atomic writes, linked second copy, unchanged files left alone).
+"""
+import json
+import sys
+from pathlib import Path
+
+import output_sink
+
+FORMATS = ("json", "parquet", "arrow")
+EXTENSIONS = {"json": ".json", "parquet": ".parquet", "arrow": ".arrow"}
+# Record keys besides "date" that become float columns
+VALUE_COLUMNS = ("value", "min", "max")
+
+
+def add_format_argument(parser):
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="json",
+        help="Output format: json (frontend, default), or one columnar parquet/arrow table",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Also write data/<dataset>/index.json + one JSON file per station",
+    )
+
+
+def flatten_series(series: dict, levels: tuple) -> dict:
+    """
+    Nested {station_id: [{date, value}] | {kind: [...] | {...}}} -> columns {level..., date, value}.
+    `levels` names the dict keys from the top (e.g. ("station_id", "kind")); levels a branch
+    does not reach are None, as are min / max for records without them (columns appear only
+    if some record has the key).
+    """
+    columns = {name: [] for name in levels}
+    columns["date"] = []
+    for name in VALUE_COLUMNS:
+        columns[name] = []
+
+    def walk(node, keys):
+        if isinstance(node, dict):
+            for k, child in node.items():
+                walk(child, keys + (k,))
+            return
+        padded = keys + (None,) * (len(levels) - len(keys))
+        for rec in node:
+            for name, k in zip(levels, padded):
+                columns[name].append(k)
+            columns["date"].append(rec["date"])
+            for name in VALUE_COLUMNS:
+                columns[name].append(rec.get(name))
+
+    walk(series, ())
+    return {k: v for k, v in columns.items() if k in levels or k in ("date", "value") or any(x is not None for x in v)}
+
+
+def write_json(obj, paths):
+    """Serialize once (indent=2) and write to every path; unchanged files are not rewritten."""
+    return output_sink.write_json(obj, paths)
+
+
+def write_table(columns: dict, paths, fmt: str, metadata=None):
+    """
+    Write columns {name: list} as one parquet/arrow table to each path; 'date' is stored as
+    date32, or as timestamp[s] if any value has a time of day (hourly series).
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("Install: pip install pyarrow", file=sys.stderr)
+        sys.exit(1)
+    arrays, names = [], []
+    for name, values in columns.items():
+        if name == "date":
+            strings = [str(d) for d in values]
+            if any(len(d) > 10 for d in strings):
+                arr = pa.array(strings, type=pa.string()).cast(pa.timestamp("s"))
+            else:
+                arr = pa.array(strings, type=pa.string()).cast(pa.date32())
+        elif name in VALUE_COLUMNS:
+            arr = pa.array(values, type=pa.float64())
+        else:
+            arr = pa.array(values, type=pa.string()).dictionary_encode()
+        arrays.append(arr)
+        names.append(name)
+    table = pa.Table.from_arrays(arrays, names=names)
+    if metadata:
+        table = table.replace_schema_metadata({k: json.dumps(v) for k, v in metadata.items()})
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    output_sink.write_bytes(sink.getvalue().to_pybytes(), paths)
+    return table
+
+
+def _extent(node):
+    """(first date, last date, record count) over all record lists under `node`."""
+    if isinstance(node, dict):
+        start, end, count = None, None, 0
+        for child in node.values():
+            s, e, n = _extent(child)
+            if n:
+                start = s if start is None else min(start, s)
+                end = e if end is None else max(end, e)
+                count += n
+        return start, end, count
+    if not node:
+        return None, None, 0
+    dates = [rec["date"] for rec in node]
+    return min(dates), max(dates), len(dates)
+
+
+def shard_dir(path) -> Path:
+    """frontend/data/precipitation_data.json -> frontend/data/precipitation/."""
+    path = Path(path)
+    return path.with_name(path.stem.removesuffix("_data"))
+
+
+def write_shards(series: dict, paths, extra=None) -> dict:
+    """
+    Write one <station_id>.json per station and index.json into shard_dir(p) for each path;
+    shards from earlier runs for stations no longer in `series` are removed. `extra` is merged
+    into the index (e.g. the discharge station list). Returns the index.
+    """
+    encoded = {sid: json.dumps(data, separators=(",", ":")).encode("utf-8") for sid, data in series.items()}
+    shards = []
+    for sid, data in series.items():
+        start, end, count = _extent(data)
+        shards.append(
+            {"id": sid, "file": f"{sid}.json", "start": start, "end": end, "count": count, "bytes": len(encoded[sid])}
+        )
+    index = dict(extra or {}, shards=shards)
+    folders = [shard_dir(p) for p in paths]
+    for sid, body in encoded.items():
+        output_sink.write_bytes(body, [folder / f"{sid}.json" for folder in folders])
+    for folder in folders:
+        for old in folder.glob("*.json"):
+            if old.name != "index.json" and old.stem not in encoded:
+                old.unlink()
+    write_json(index, [folder / "index.json" for folder in folders])
+    return index
+
+
+def remove_shards(paths) -> int:
+    """Delete index.json and the shards it lists from shard_dir(p) of each path (folder too, if then empty)."""
+    removed = 0
+    for folder in {shard_dir(p) for p in paths}:
+        index_path = folder / "index.json"
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for entry in index.get("shards", []):
+            shard = folder / Path(str(entry.get("file", ""))).name
+            if shard.suffix == ".json" and shard.is_file():
+                shard.unlink()
+                removed += 1
+        index_path.unlink()
+        try:
+            folder.rmdir()
+        except OSError:
+            pass
+    return removed
+
+
+def write_export(
+    obj: dict, series: dict, paths, fmt: str, levels: tuple, metadata=None, shards=False, index_extra=None
+) -> list:
+    """
+    Write one dataset in `fmt` to every target (JSON paths; other formats swap the extension),
+    plus the per-station shards if `shards` (otherwise shards left by an earlier export are
+    removed). Returns the paths written.
+    """
+    targets = [Path(p).with_suffix(EXTENSIONS[fmt]) for p in paths]
+    if fmt == "json":
+        write_json(obj, targets)
+    else:
+        write_table(flatten_series(series, levels), targets, fmt, metadata)
+    if shards:
+        write_shards(series, paths, index_extra)
+    else:
+        remove_shards(paths)
+    return targets
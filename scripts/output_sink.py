@@ -0,0 +1,130 @@
+"""
+Write-once output fan-out for the export / deploy scripts (frontend/data + docs/data, ...).
+
+write_bytes(data, paths) takes content that is already serialized (write_json serializes
+once) and, per target:
+- skips it when the file already holds exactly these bytes (size, then SHA-256), so
+  unchanged exports do not touch the file or its mtime;
+- otherwise writes it atomically (temp file in the same folder + os.replace), so a reader
+  never sees a half-written file;
+- for the second and later targets, links to the first instead of writing again: a
+  reflink (copy-on-write clone, btrfs/XFS/...) where the filesystem supports it, else a
+  hardlink, else a plain write. The link is made under a temp name and renamed over the
+  target, so it is atomic as well; since every write replaces the file, linked targets
+  are never modified through each other.
+
+Hardlinks are used only for generated data (hardlink=True, default); copy_file uses
+reflink-or-copy for source trees, so editing one copy in place cannot change the other.
+SWAT_OUTPUT_LINK=copy disables linking altogether.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+LINK_MODE = os.environ.get("SWAT_OUTPUT_LINK", "auto")
+FILE_MODE = 0o644
+_FICLONE = 0x40049409  # linux/fs.h
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _holds(path: Path, size: int, digest: str) -> bool:
+    try:
+        if path.stat().st_size != size:
+            return False
+        return _sha256_file(path) == digest
+    except OSError:
+        return False
+
+
+def _atomic_write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def _link_over(src: Path, dst: Path, hardlink: bool) -> bool:
+    """Replace dst with a reflink (or hardlink) of src; False if neither works here."""
+    if LINK_MODE == "copy":
+        return False
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    if _reflink(src, tmp):
+        os.chmod(tmp, FILE_MODE)
+    elif hardlink:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            return False
+    else:
+        return False
+    os.replace(tmp, dst)
+    return True
+
+
+def write_bytes(data: bytes, paths, hardlink: bool = True, source=None) -> list:
+    """
+    Put `data` at every path (see module docstring). `source` is an existing file that
+    already holds `data` to link from (e.g. the file being copied). Returns the paths that
+    were (re)written; unchanged ones are left alone.
+    """
+    size, digest = len(data), hashlib.sha256(data).hexdigest()
+    source = Path(source) if source is not None else None
+    written = []
+    for path in map(Path, paths):
+        if source is not None and path.exists() and os.path.samefile(source, path):
+            continue
+        if _holds(path, size, digest):
+            source = source or path
+            continue
+        if source is None or not _link_over(source, path, hardlink):
+            _atomic_write(path, data)
+        source = source or path
+        written.append(path)
+    return written
+
+
+def dumps_json(obj, indent=2) -> bytes:
+    """The exports' JSON text (json.dump(obj, f, indent=2) byte for byte) as UTF-8 bytes."""
+    return json.dumps(obj, indent=indent).encode("utf-8")
+
+
+def write_json(obj, paths, indent=2) -> list:
+    """Serialize `obj` once and write_bytes it to every path."""
+    return write_bytes(dumps_json(obj, indent), paths)
+
+
+def copy_file(src, dst, hardlink: bool = False) -> bool:
+    """Copy src to dst unless dst already has the same content; True if dst was written."""
+    src = Path(src)
+    return bool(write_bytes(src.read_bytes(), [dst], hardlink=hardlink, source=src))
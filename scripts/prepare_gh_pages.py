@@ -2,27 +2,44 @@
 Prepare files for GitHub Pages deployment.
 Run: python scripts/prepare_gh_pages.py
 Creates/updates the 'docs' folder with frontend + exported data for GitHub Pages.
+Files whose content already matches are left untouched (see output_sink.py), so a re-run
+only rewrites what changed.
 """
-import shutil
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 FRONTEND = PROJECT_ROOT / "frontend"
 DOCS = PROJECT_ROOT / "docs"
+from output_sink import copy_file  # noqa: E402
 
 SKIP_DATA_FILES = {"water_level_data.json", "meteorological_data.json", "precipitation_data.json", "vtec_data.json", "storms_data.json"}
 
+def sync_tree(src: Path, dst: Path) -> int:
+    """Make dst a copy of src: copy new/changed files, delete files and folders src lacks."""
+    copied = 0
+    for f in src.rglob("*"):
+        if f.is_file():
+            copied += copy_file(f, dst / f.relative_to(src))
+    for f in sorted(dst.rglob("*"), reverse=True):
+        if (src / f.relative_to(dst)).exists():
+            continue
+        if f.is_dir() and not f.is_symlink():
+            f.rmdir()
+        else:
+            f.unlink()
+    return copied
+
+
 def main():
     DOCS.mkdir(exist_ok=True)
+    copied = 0
     for name in ["index.html", "css", "js", "vendor", "images"]:
         src = FRONTEND / name
         dst = DOCS / name
         if src.is_file():
-            shutil.copy2(src, dst)
+            copied += copy_file(src, dst)
         elif src.is_dir():
-            if dst.exists():
-                shutil.rmtree(dst)
-            shutil.copytree(src, dst)
+            copied += sync_tree(src, dst)
     # Copy data/ but skip large JSON files (plots are PNGs, data stays local)
     src_data = FRONTEND / "data"
     dst_data = DOCS / "data"
@@ -30,8 +47,8 @@ def main():
     if src_data.is_dir():
         for f in src_data.iterdir():
             if f.is_file() and f.name not in SKIP_DATA_FILES:
-                shutil.copy2(f, dst_data / f.name)
-    print(f"Prepared {DOCS} for GitHub Pages.")
+                copied += copy_file(f, dst_data / f.name)
+    print(f"Prepared {DOCS} for GitHub Pages ({copied} files updated).")
     print("In repo Settings > Pages > Source: Deploy from branch 'main', folder: /docs")
 
 if __name__ == "__main__":
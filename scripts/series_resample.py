@@ -0,0 +1,142 @@
+"""
+Time aggregation for the NOAA export scripts (6-minute / hourly CSVs -> hourly or daily points).
+
+Each product is exported at a resolution:
+  raw     every row, dated YYYY-MM-DD (the old behaviour: ~240 same-date points per day at 6 minutes)
+  hourly  one point per hour, dated YYYY-MM-DDTHH:00
+  daily   one point per day, dated YYYY-MM-DD
+Aggregated records are {"date", "value"} with value = mean, plus "min" / "max" when those
+statistics are requested (daily extremes are what surge analysis looks at).
+
+Timestamps are cast to integer hour/day ordinals (datetime64[h] / [D]); the sorted ordinals
+are split into runs and reduced per run with np.add/minimum/maximum.reduceat, so there is
+no Python loop over rows or buckets.
+
+Command line: --resample [PRODUCT=]RESOLUTION[:STATS], repeatable; without PRODUCT= it sets
+every product. STATS is a comma-separated subset of mean,min,max (mean is always exported
+as "value"); the default is mean,min,max.
+  --resample raw                                 old per-row output
+  --resample hourly --resample water_level=daily:mean,max
+"""
+
+RESOLUTIONS = ("raw", "hourly", "daily")
+STATISTICS = ("mean", "min", "max")
+DEFAULT_RESOLUTION = "daily"
+_UNITS = {"hourly": "h", "daily": "D"}
+# Record key for each statistic
+_KEYS = {"mean": "value", "min": "min", "max": "max"}
+# Decimals kept for aggregated values when the caller gives none (means are not on the sensor grid)
+AGGREGATE_NDIGITS = 4
+
+
+def parse_spec(text: str) -> tuple:
+    """'daily' / 'hourly:min,max' / 'raw' -> (resolution, stats). Raises ValueError."""
+    resolution, _, stats = text.strip().partition(":")
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"unknown resolution {resolution!r} (expected one of {', '.join(RESOLUTIONS)})")
+    if resolution == "raw":
+        return ("raw", ())
+    names = [s.strip() for s in stats.split(",") if s.strip()] if stats else list(STATISTICS)
+    for s in names:
+        if s not in STATISTICS:
+            raise ValueError(f"unknown statistic {s!r} (expected one of {', '.join(STATISTICS)})")
+    return (resolution, tuple(s for s in STATISTICS if s == "mean" or s in names))
+
+
+def add_resample_argument(parser, products):
+    parser.add_argument(
+        "--resample",
+        action="append",
+        default=[],
+        metavar="[PRODUCT=]RESOLUTION[:STATS]",
+        help=(
+            f"Aggregate to raw|hourly|daily with stats from mean,min,max (default {DEFAULT_RESOLUTION}:mean,min,max). "
+            f"Repeatable; PRODUCT is one of {', '.join(products)}"
+        ),
+    )
+
+
+def resample_config(parser, values, products) -> dict:
+    """Parsed --resample values -> {product: (resolution, stats)}; bad values exit via parser.error."""
+    config = {p: parse_spec(DEFAULT_RESOLUTION) for p in products}
+    for value in values:
+        product, sep, spec = value.partition("=")
+        if not sep:
+            product, spec = None, value
+        elif product not in config:
+            parser.error(f"--resample: unknown product {product!r} (expected one of {', '.join(products)})")
+        try:
+            parsed = parse_spec(spec)
+        except ValueError as e:
+            parser.error(f"--resample: {e}")
+        for p in [product] if product else products:
+            config[p] = parsed
+    return config
+
+
+def describe(config: dict) -> dict:
+    """{product: {"resolution", "stats"}} for the export's metadata."""
+    return {p: {"resolution": res, "stats": list(stats)} for p, (res, stats) in config.items()}
+
+
+def aggregate(dt, values, resolution: str, stats=STATISTICS):
+    """
+    Timestamps + values -> (bucket labels as datetime64[h|D] array, {stat: float array}).
+    Rows need not be sorted; NaN values should be dropped beforehand.
+    """
+    import numpy as np
+
+    buckets = np.asarray(dt).astype(f"datetime64[{_UNITS[resolution]}]")
+    v = np.asarray(values, dtype=np.float64)
+    if len(buckets) == 0:
+        return buckets, {s: v for s in stats}
+    order = np.argsort(buckets, kind="stable")
+    buckets, v = buckets[order], v[order]
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    out = {}
+    if "mean" in stats:
+        counts = np.diff(np.r_[starts, len(v)])
+        out["mean"] = np.add.reduceat(v, starts) / counts
+    if "min" in stats:
+        out["min"] = np.minimum.reduceat(v, starts)
+    if "max" in stats:
+        out["max"] = np.maximum.reduceat(v, starts)
+    return buckets[starts], out
+
+
+def _labels(stamps, resolution: str) -> list:
+    if resolution == "hourly":
+        return [s + ":00" for s in stamps.astype("datetime64[h]").astype(str).tolist()]
+    return stamps.astype("datetime64[D]").astype(str).tolist()
+
+
+def _rounded(arr, ndigits):
+    vals = arr.astype(float).tolist()
+    if ndigits is not None:
+        vals = [round(v, ndigits) for v in vals]
+    return vals
+
+
+def series_records(dt, values, spec: tuple, ndigits=None) -> list:
+    """
+    Timestamps (Series / datetime64 array) + values -> [{date, value[, min, max]}] at the
+    resolution in `spec` ((resolution, stats) from parse_spec). Values are rounded to `ndigits`
+    (aggregates to AGGREGATE_NDIGITS if not given).
+    """
+    import numpy as np
+
+    resolution, stats = spec
+    stamps = np.asarray(dt).astype("datetime64[ns]")
+    if resolution == "raw":
+        return [{"date": d, "value": v} for d, v in zip(_labels(stamps, "daily"), _rounded(np.asarray(values), ndigits))]
+    buckets, agg = aggregate(stamps, values, resolution, stats)
+    if ndigits is None:
+        ndigits = AGGREGATE_NDIGITS
+    columns = [(_KEYS[s], _rounded(agg[s], ndigits)) for s in stats]
+    records = []
+    for i, d in enumerate(_labels(buckets, resolution)):
+        rec = {"date": d}
+        for key, vals in columns:
+            rec[key] = vals[i]
+        records.append(rec)
+    return records